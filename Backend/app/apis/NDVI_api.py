@@ -1,20 +1,87 @@
-from fastapi import APIRouter, HTTPException, Query, Depends  # type: ignore
+from fastapi import APIRouter, HTTPException, Query, Depends, Header, Request  # type: ignore
+from fastapi.responses import FileResponse, Response  # type: ignore
 from sqlalchemy.orm import Session # type: ignore
 from datetime import datetime, timedelta
-from typing import Annotated
+from typing import Annotated, Dict, Optional
 import traceback
+import base64
+import hashlib
+import os
 
-from app.services.NDVI_service import NDVIService
-from app.models.NDVI_model import NDVIRequest, NDVIResponse, NDVIFieldRequest, NDVIHistoryRequest
+from app.models.NDVI_model import NDVIRequest, NDVIResponse, NDVIFieldRequest, NDVIHistoryRequest, NDVIFieldsRequest
 from app.core.security import get_current_user, oauth2_scheme
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
+from app.core.config import settings
+from app.core.executor import run_io
+from app.core.readiness import lazy_resource
+from app.core.http_cache import make_etag, etag_matches, http_date, cached_response
 from app.models import db_model
+from app.services import NDVI_store
+from app.services.fields_service import field_geometry, fields_intersecting
+from app.services.NDVI_tiles import tile_bounds_wgs84
+from app.services.NDVI_precompute import NDVIPrecomputeScheduler, find_snapshot, snapshot_response
 
 router = APIRouter(prefix="/ndvi", tags=["NDVI"])
-ndvi_service = NDVIService()
+
+def _load_ndvi_service():
+    # sentinelhub is a heavy import, so it's only pulled in on first use / warm-up
+    from app.services.NDVI_service import NDVIService
+    return NDVIService()
+
+ndvi_service = lazy_resource("sentinel_hub", _load_ndvi_service)
+
+# Started from the app lifespan when ndvi_precompute_enabled is set
+precompute_scheduler = NDVIPrecomputeScheduler(
+    SessionLocal,
+    ndvi_service.get,
+    interval_minutes=settings.ndvi_precompute_interval_minutes,
+    window_days=settings.ndvi_precompute_window_days,
+    concurrency=settings.ndvi_precompute_concurrency,
+    retries=settings.ndvi_precompute_retries,
+    backoff_s=settings.ndvi_precompute_backoff_s
+)
 
 from app.models.NDVI_model import NDVIFieldRequest
 
+def _get_owned_field(db: Session, field_id: int, user_id: int):
+    # Blocking DB lookup, run on the io pool from the async routes
+    return db.query(db_model.Field).filter(
+        db_model.Field.id == field_id,
+        db_model.Field.user_id == user_id
+    ).first()
+
+def _precomputed_snapshot(db: Session, field_id: int, start_date: str, end_date: str):
+    """Scheduler snapshot for this window; only looked up while the precompute scheduler is on."""
+    if not settings.ndvi_precompute_enabled:
+        return None
+    return find_snapshot(db, field_id, start_date, end_date)
+
+def _image_cache_headers(kind: str, field: db_model.Field, ndvi_req: NDVIRequest) -> Dict[str, str]:
+    """
+    ETag / Last-Modified / Cache-Control for a field image and date window.
+
+    A final window (see NDVI_store.is_final_window) can't get new scenes, so
+    its ETag only depends on the field and window and no upstream call is
+    needed to answer a conditional request. For a recent window the newest
+    catalog acquisition is part of the ETag, so it changes when a new (or
+    late-delivered) scene arrives.
+    """
+    end = datetime.strptime(ndvi_req.end_date, "%Y-%m-%d").date()
+    today = datetime.now().date()
+    if NDVI_store.is_final_window(ndvi_req.end_date):
+        version, modified = "final", end
+        cache_control = f"private, max-age={settings.ndvi_past_image_max_age_s}, immutable"
+    else:
+        latest = ndvi_service.get().latest_acquisition_date(ndvi_req)
+        version = latest or today.isoformat()
+        modified = datetime.strptime(latest, "%Y-%m-%d").date() if latest else today
+        cache_control = f"private, max-age={settings.ndvi_image_max_age_s}"
+    etag = make_etag(
+        kind, field.id, [field.west, field.south, field.east, field.north], ndvi_req.geometry,
+        ndvi_req.start_date, ndvi_req.end_date, version
+    )
+    return {"ETag": etag, "Last-Modified": http_date(modified), "Cache-Control": cache_control}
+
 @router.post("/analyze", response_model=NDVIResponse)
 async def analyze_ndvi_for_field(
     req: NDVIFieldRequest,
@@ -32,22 +99,25 @@ async def analyze_ndvi_for_field(
         raise HTTPException(status_code=400, detail="End date cannot be in the future")
 
     # Find field & check ownership
-    field = db.query(db_model.Field).filter(
-        db_model.Field.id == req.field_id,
-        db_model.Field.user_id == current_user.id
-    ).first()
+    field = await run_io(_get_owned_field, db, req.field_id, current_user.id)
     if not field:
         raise HTTPException(status_code=404, detail="Field not found or does not belong to user")
 
+    # Precomputed by the background scheduler for the dashboard window
+    snapshot = await run_io(_precomputed_snapshot, db, field.id, req.start_date, req.end_date)
+    if snapshot is not None:
+        return snapshot_response(snapshot)
+
     ndvi_request = NDVIRequest(
         north=field.north,
         south=field.south,
         east=field.east,
         west=field.west,
         start_date=req.start_date,
-        end_date=req.end_date
+        end_date=req.end_date,
+        geometry=field_geometry(field)
     )
-    result = ndvi_service.calculate_ndvi(ndvi_request)
+    result = await run_io(lambda: ndvi_service.get().calculate_ndvi(ndvi_request))
     return result
 
 @router.post("/history")  # switched from GET to POST for JSON body
@@ -62,19 +132,21 @@ async def get_ndvi_history_for_field(
         if req.days < req.step_days:
             raise HTTPException(status_code=400, detail="`days` must be >= `step_days`")
 
-        field = db.query(db_model.Field).filter(
-            db_model.Field.id == req.field_id,
-            db_model.Field.user_id == current_user.id
-        ).first()
+        field = await run_io(_get_owned_field, db, req.field_id, current_user.id)
         if not field:
             raise HTTPException(status_code=404, detail="Field not found or does not belong to user")
 
-        # Ensure numeric
-        center_lat = (float(field.north) + float(field.south)) / 2
-        center_lon = (float(field.east) + float(field.west)) / 2
+        center_lat, center_lon = NDVI_store.field_center(field)
 
-        history = ndvi_service.get_ndvi_history(center_lat, center_lon, req.days, req.step_days)
-        trend = ndvi_service.analyze_trend(history)
+        if req.mode == "timeseries":
+            # served from the observation store; only dates not stored yet hit Sentinel Hub
+            history = await run_io(lambda: NDVI_store.get_field_history(db, ndvi_service.get(), field, req.days, req.step_days))
+            failures = []
+        elif req.mode == "windows":
+            history, failures = await run_io(lambda: ndvi_service.get().get_ndvi_history(center_lat, center_lon, req.days, req.step_days))
+        else:
+            raise HTTPException(status_code=400, detail="`mode` must be 'timeseries' or 'windows'")
+        trend = ndvi_service.get().analyze_trend(history)
 
         return {
             "field_id": req.field_id,
@@ -82,9 +154,12 @@ async def get_ndvi_history_for_field(
             "latitude": center_lat,
             "longitude": center_lon,
             "history": history,
+            "failed_dates": failures,
             "trend_analysis": trend
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -105,7 +180,7 @@ async def get_vegetation_health(
             start_date=(today - timedelta(days=1)).strftime("%Y-%m-%d"),
             end_date=today.strftime("%Y-%m-%d")
         )
-        result = ndvi_service.calculate_ndvi(request)
+        result = await run_io(lambda: ndvi_service.get().calculate_ndvi(request))
         return {
             "latitude": latitude,
             "longitude": longitude,
@@ -123,13 +198,11 @@ async def get_satellite_image_for_field(
     req: NDVIFieldRequest,
     db: Annotated[Session, Depends(get_db)],
     token: str = Depends(oauth2_scheme),
-    current_user: db_model.User = Depends(get_current_user)
+    current_user: db_model.User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     print("Token received:", token)
-    field = db.query(db_model.Field).filter(
-        db_model.Field.id == req.field_id,
-        db_model.Field.user_id == current_user.id
-    ).first()
+    field = await run_io(_get_owned_field, db, req.field_id, current_user.id)
     if not field:
         raise HTTPException(status_code=404, detail="Field not found or does not belong to user")
 
@@ -141,20 +214,23 @@ async def get_satellite_image_for_field(
         start_date=req.start_date,
         end_date=req.end_date
     )
-    return ndvi_service.get_true_color_image(ndvi_req)
+    headers = await run_io(_image_cache_headers, "true_color", field, ndvi_req)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return cached_response(b"", headers, if_none_match)
+
+    png = await run_io(lambda: ndvi_service.get().get_true_color_png(ndvi_req))
+    return cached_response(png, headers)
 
 @router.post("/heatmap")
 async def get_ndvi_heatmap_image_for_field(
     req: NDVIFieldRequest,
     db: Annotated[Session, Depends(get_db)],
     token: str = Depends(oauth2_scheme),
-    current_user: db_model.User = Depends(get_current_user)
+    current_user: db_model.User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     print("Token received:", token)
-    field = db.query(db_model.Field).filter(
-        db_model.Field.id == req.field_id,
-        db_model.Field.user_id == current_user.id
-    ).first()
+    field = await run_io(_get_owned_field, db, req.field_id, current_user.id)
     if not field:
         raise HTTPException(status_code=404, detail="Field not found or does not belong to user")
 
@@ -164,9 +240,258 @@ async def get_ndvi_heatmap_image_for_field(
         east=field.east,
         west=field.west,
         start_date=req.start_date,
-        end_date=req.end_date
+        end_date=req.end_date,
+        geometry=field_geometry(field)
     )
-    return ndvi_service.get_heatmap_image(ndvi_req)
+    headers = await run_io(_image_cache_headers, "heatmap", field, ndvi_req)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return cached_response(b"", headers, if_none_match)
+
+    snapshot = await run_io(_precomputed_snapshot, db, field.id, req.start_date, req.end_date)
+    if snapshot is not None:
+        return cached_response(snapshot.heatmap_png, headers)
+
+    png = await run_io(lambda: ndvi_service.get().get_heatmap_png(ndvi_req))
+    return cached_response(png, headers)
+
+@router.post("/analyze-heatmap")
+async def analyze_ndvi_with_heatmap_for_field(
+    req: NDVIFieldRequest,
+    db: Annotated[Session, Depends(get_db)],
+    token: str = Depends(oauth2_scheme),
+    current_user: db_model.User = Depends(get_current_user)
+):
+    """NDVI stats + heatmap PNG (base64) from a single Sentinel Hub fetch."""
+    field = await run_io(_get_owned_field, db, req.field_id, current_user.id)
+    if not field:
+        raise HTTPException(status_code=404, detail="Field not found or does not belong to user")
+
+    snapshot = await run_io(_precomputed_snapshot, db, field.id, req.start_date, req.end_date)
+    if snapshot is not None:
+        return {
+            "analysis": snapshot_response(snapshot),
+            "heatmap_png_base64": base64.b64encode(snapshot.heatmap_png).decode("ascii")
+        }
+
+    ndvi_req = NDVIRequest(
+        north=field.north,
+        south=field.south,
+        east=field.east,
+        west=field.west,
+        start_date=req.start_date,
+        end_date=req.end_date,
+        geometry=field_geometry(field)
+    )
+    analysis, heatmap_png = await run_io(lambda: ndvi_service.get().analyze_with_heatmap(ndvi_req))
+    return {
+        "analysis": analysis,
+        "heatmap_png_base64": base64.b64encode(heatmap_png).decode("ascii")
+    }
+
+@router.api_route("/export/{field_id}.tif", methods=["GET", "HEAD"])
+async def export_ndvi_geotiff_for_field(
+    field_id: int,
+    request: Request,
+    db: Annotated[Session, Depends(get_db)],
+    start_date: str = Query(..., description="YYYY-MM-DD"),
+    end_date: str = Query(..., description="YYYY-MM-DD"),
+    current_user: db_model.User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    The field's NDVI raster as a cloud-optimized GeoTIFF (float32, NaN = no data).
+    Supports Range requests, so GIS clients can read just the tiles they need;
+    they all read one file built per ETag. HEAD never builds the file (it only
+    has a Content-Length once a GET built it).
+    """
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+
+    field = await run_io(_get_owned_field, db, field_id, current_user.id)
+    if not field:
+        raise HTTPException(status_code=404, detail="Field not found or does not belong to user")
+
+    ndvi_req = NDVIRequest(
+        north=field.north,
+        south=field.south,
+        east=field.east,
+        west=field.west,
+        start_date=start_date,
+        end_date=end_date,
+        geometry=field_geometry(field)
+    )
+    headers = await run_io(_image_cache_headers, "geotiff", field, ndvi_req)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return cached_response(b"", headers, if_none_match)
+
+    filename = f"ndvi_field_{field.id}_{start_date}_{end_date}.tif"
+    if request.method == "HEAD":
+        path = await run_io(lambda: ndvi_service.get().cached_geotiff_export(ndvi_req, headers["ETag"]))
+        head_headers = {**headers, "Accept-Ranges": "bytes",
+                        "Content-Disposition": f'attachment; filename="{filename}"'}
+        response = Response(headers=head_headers, media_type="image/tiff")
+        if path is not None:
+            response.headers["Content-Length"] = str(os.path.getsize(path))
+        else:
+            del response.headers["Content-Length"]  # not built yet, so the size is unknown
+        return response
+
+    path = await run_io(lambda: ndvi_service.get().export_ndvi_geotiff(ndvi_req, headers["ETag"]))
+    if path is None:
+        raise HTTPException(status_code=404, detail="No usable Sentinel-2 scene in the time window")
+    return FileResponse(path, media_type="image/tiff", filename=filename, headers=headers)
+
+@router.get("/tiles/stats")
+async def get_map_tile_stats(
+    current_user: db_model.User = Depends(get_current_user)
+):
+    """Tile pyramid cache: hits, metatiles fetched from Sentinel Hub, memory used."""
+    return (await run_io(ndvi_service.get)).tile_pyramid.stats()
+
+@router.get("/tiles/{z}/{x}/{y}.png")
+async def get_ndvi_map_tile(
+    z: int,
+    x: int,
+    y: int,
+    db: Annotated[Session, Depends(get_db)],
+    date: Optional[str] = Query(None, description="Last day of the window (YYYY-MM-DD), default today"),
+    days: int = Query(settings.ndvi_map_tile_window_days, ge=1, le=90,
+                      description="Window length in days; the most recent clear pixels in it are shown"),
+    current_user: db_model.User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    NDVI heatmap as an XYZ map tile (Web Mercator, 256 px); no-data pixels are
+    transparent. Tiles without any of the user's fields are transparent too
+    and cost no Sentinel Hub request.
+    """
+    try:
+        end = datetime.strptime(date, "%Y-%m-%d") if date else datetime.now()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if end > datetime.now():
+        raise HTTPException(status_code=400, detail="Date cannot be in the future")
+    start_date, end_date = (end - timedelta(days=days)).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+    west, south, east, north = tile_bounds_wgs84(z, x, y)
+    covered = bool(await run_io(fields_intersecting, db, west, south, east, north, user_id=current_user.id))
+
+    # a field added later must show up, so only data tiles of finished windows are final
+    past = covered and NDVI_store.is_final_window(end_date)
+    if past:
+        # a final window never changes, so conditional requests skip the pyramid entirely
+        headers = {
+            "ETag": make_etag("map_tile", z, x, y, start_date, end_date, "final"),
+            "Last-Modified": http_date(end.date()),
+            "Cache-Control": f"private, max-age={settings.ndvi_past_image_max_age_s}, immutable",
+        }
+        if etag_matches(if_none_match, headers["ETag"]):
+            return cached_response(b"", headers, if_none_match)
+
+    try:
+        png = await run_io(lambda: ndvi_service.get().get_map_tile_png(z, x, y, start_date, end_date, covered))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if not past:
+        headers = {
+            "ETag": make_etag("map_tile", hashlib.sha256(png).hexdigest()),
+            "Cache-Control": f"private, max-age={settings.ndvi_image_max_age_s}",
+        }
+    return cached_response(png, headers, if_none_match)
+
+@router.post("/region/analyze", response_model=NDVIResponse)
+async def analyze_ndvi_for_region(
+    req: NDVIRequest,
+    token: str = Depends(oauth2_scheme),
+    current_user: db_model.User = Depends(get_current_user)
+):
+    """
+    NDVI stats for an arbitrary (e.g. district-sized) bbox. Large areas are
+    fetched in tiles with bounded memory; see NDVIService.calculate_ndvi_tiled.
+    Areas of more than ndvi_region_max_tiles tiles are refused with 413.
+    """
+    if None in (req.north, req.south, req.east, req.west):
+        raise HTTPException(status_code=400, detail="north, south, east and west are required")
+    if req.north <= req.south or req.east <= req.west:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    max_tiles = settings.ndvi_region_max_tiles
+    if max_tiles > 0:
+        tiles = await run_io(lambda: ndvi_service.get().region_tile_count(req))
+        if tiles > max_tiles:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Region too large: {tiles} tiles at the configured resolution (max {max_tiles})"
+            )
+
+    return await run_io(lambda: ndvi_service.get().calculate_ndvi_tiled(req))
+
+@router.post("/fields/analyze")
+async def analyze_ndvi_for_fields(
+    req: NDVIFieldsRequest,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: db_model.User = Depends(get_current_user)
+):
+    """
+    NDVI stats for several of the user's fields; nearby fields share one
+    Sentinel Hub request (see NDVIService.calculate_ndvi_for_fields).
+    """
+    def load_fields():
+        query = db.query(db_model.Field).filter(db_model.Field.user_id == current_user.id)
+        if req.field_ids:
+            query = query.filter(db_model.Field.id.in_(req.field_ids))
+        return query.all()
+
+    fields = await run_io(load_fields)
+    if not fields:
+        raise HTTPException(status_code=404, detail="No matching fields for this user")
+
+    results, failures, groups = await run_io(
+        lambda: ndvi_service.get().calculate_ndvi_for_fields(fields, req.start_date, req.end_date)
+    )
+    return {
+        "fields": [
+            {"field_id": field.id, "field_name": field.name, "analysis": results[field.id]}
+            for field in fields if field.id in results
+        ],
+        "failed": failures,
+        "upstream_requests": len(groups),
+    }
+
+@router.get("/cache-stats")
+async def get_raster_cache_stats(
+    current_user: db_model.User = Depends(get_current_user)
+):
+    return (await run_io(ndvi_service.get)).raster_cache.stats()
+
+@router.get("/upstream-stats")
+async def get_upstream_stats(
+    current_user: db_model.User = Depends(get_current_user)
+):
+    """
+    Upstream savings: callers that shared an identical in-flight fetch, and
+    pixel downloads skipped after a catalog lookup found no usable scene.
+    pixel_requests is what actually went to the Sentinel Hub Process API;
+    single-flight "executed" calls also include raster cache hits.
+    """
+    service = await run_io(ndvi_service.get)
+    return {
+        "pixel_requests": service.pixel_requests,
+        "single_flight": service.single_flight.stats(),
+        "catalog": service.catalog.stats() if service.catalog is not None else None,
+    }
+
+@router.get("/precompute/status")
+async def get_precompute_status(
+    current_user: db_model.User = Depends(get_current_user)
+):
+    """Background NDVI precompute: queue depth, last/next run and the last run's counts."""
+    return precompute_scheduler.status()
 
 def _get_recommendations(health_status: str) -> list:
     recommendations = {
@@ -6,43 +6,70 @@ from fastapi.security import OAuth2PasswordRequestForm
 from app.models import auth_model, db_model
 from app.services import auth_service
 from app.core.database import get_db
+from app.core.executor import run_io, run_password, Overloaded
 
 
 router = APIRouter(
     tags=["auth"]
 )
 
+def _find_user(db: Session, phone: str):
+    return db.query(db_model.User).filter(db_model.User.phone == phone).first()
+
+async def _password_work(func, *args):
+    """bcrypt on the bounded password pool; 503 when a burst has filled it up."""
+    try:
+        return await run_password(func, *args)
+    except Overloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins at the moment, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
 @router.post("/register", response_model=auth_model.Token)
-def register(
+async def register(
     user_data: auth_model.UserCreate,
     db: Annotated[Session, Depends(get_db)]
 ):
-    existing = db.query(db_model.User).filter(db_model.User.phone == user_data.phone).first()
+    existing = await run_io(_find_user, db, user_data.phone)
     if existing:
         raise HTTPException(status_code=400, detail="Phone number already registered")
 
-    hashed = auth_service.hash_password(user_data.password)
+    hashed = await _password_work(auth_service.hash_password, user_data.password)
     new_user = db_model.User(
         name=user_data.name,
         phone=user_data.phone,
         hashed_password=hashed
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+
+    def save():
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+    await run_io(save)
 
     access_token = auth_service.create_access_token(data={"sub": str(new_user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/token", response_model=auth_model.Token)
-def login(
+async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Annotated[Session, Depends(get_db)]
 ):
     # Note: form_data.username is actually the email
-    user = db.query(db_model.User).filter(db_model.User.phone == form_data.username).first()
-    if not user or not auth_service.verify_password(form_data.password, user.hashed_password):
+    user = await run_io(_find_user, db, form_data.username)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await _password_work(auth_service.verify_and_update, form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # stored with an older bcrypt cost; upgrade it now that we have the password
+        def rehash():
+            user.hashed_password = new_hash
+            db.commit()
+        await run_io(rehash)
 
     access_token = auth_service.create_access_token(data={"sub": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
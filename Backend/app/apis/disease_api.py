@@ -1,6 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException  # type: ignore
-from app.services.disease_service import predict_disease
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query  # type: ignore
+from typing import List
+import asyncio
+from app.services.disease_service import preprocess_image, predict_disease_batch, predict_disease_top_k, class_labels
 from app.core.security import get_current_user, oauth2_scheme
+from app.core.executor import run_cpu
+from app.core.batching import MicroBatcher
+from app.core.config import settings
 from app.models import db_model
 
 router = APIRouter(
@@ -8,6 +13,13 @@ router = APIRouter(
     tags=["disease"]
 )
 
+# Concurrent /predict calls share one model.predict per batch
+disease_batcher = MicroBatcher(
+    predict_disease_batch,
+    max_batch_size=settings.disease_max_batch_size,
+    max_wait_ms=settings.disease_max_wait_ms
+)
+
 @router.post("/predict")
 async def predict_crop_disease(
     file: UploadFile = File(...),
@@ -16,7 +28,55 @@ async def predict_crop_disease(
 ):
     try:
         image_bytes = await file.read()
-        label = predict_disease(image_bytes)
+        img_array = await run_cpu(preprocess_image, image_bytes)
+        label = await disease_batcher.submit(img_array)
         return {"prediction": label}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+@router.post("/predict/batch")
+async def predict_crop_disease_batch(
+    files: List[UploadFile] = File(...),
+    top_k: int = Query(default=3, ge=1, le=len(class_labels)),
+    token: str = Depends(oauth2_scheme),
+    current_user: db_model.User = Depends(get_current_user)
+):
+    """
+    Predict many images in one request. Images are decoded in parallel and
+    run through the model in a single batch; results keep upload order.
+    """
+    if len(files) > settings.disease_max_batch_upload:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.disease_max_batch_upload} images per request"
+        )
+
+    try:
+        contents = [await f.read() for f in files]
+        decoded = await asyncio.gather(
+            *(run_cpu(preprocess_image, image_bytes) for image_bytes in contents),
+            return_exceptions=True
+        )
+
+        valid = [i for i, img in enumerate(decoded) if not isinstance(img, Exception)]
+        predictions = {}
+        if valid:
+            batch_results = await run_cpu(predict_disease_top_k, [decoded[i] for i in valid], top_k)
+            predictions = dict(zip(valid, batch_results))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+    results = []
+    for i, f in enumerate(files):
+        if i in predictions:
+            results.append({"filename": f.filename, **predictions[i]})
+        else:
+            # undecodable upload: report it without failing the other images
+            results.append({"filename": f.filename, "error": f"Could not read image: {decoded[i]}"})
+    return {"predictions": results}
+
+@router.get("/metrics")
+async def get_batching_metrics(
+    current_user: db_model.User = Depends(get_current_user)
+):
+    return disease_batcher.stats()
\ No newline at end of file
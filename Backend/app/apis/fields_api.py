@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Annotated
+import json
 
 from app.models import fields_model, db_model
 from app.core.security import get_current_user,oauth2_scheme
 from app.core.database import get_db
+from app.services.fields_service import fields_intersecting
 
 
 router = APIRouter(
@@ -26,7 +28,8 @@ def add_field(
         north=field_data.north,
         south=field_data.south,
         east=field_data.east,
-        west=field_data.west
+        west=field_data.west,
+        geometry=json.dumps(field_data.geometry) if field_data.geometry else None
     )
     db.add(new_field)
     db.commit()
@@ -42,3 +45,17 @@ def list_fields(
     print("Token received:", token)
     fields = db.query(db_model.Field).filter(db_model.Field.user_id == current_user.id).all()
     return fields
+
+@router.get("/in-region", response_model=List[fields_model.FieldOut])
+def list_fields_in_region(
+    db: Annotated[Session, Depends(get_db)],
+    north: float = Query(...),
+    south: float = Query(...),
+    east: float = Query(...),
+    west: float = Query(...),
+    current_user: db_model.User = Depends(get_current_user)
+):
+    """The user's fields whose bounds intersect the given bbox (spatial index lookup)."""
+    if north <= south or east <= west:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    return fields_intersecting(db, west, south, east, north, user_id=current_user.id)
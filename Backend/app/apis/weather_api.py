@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Query # type: ignore
 from app.services.weather_service import fetch_weather
+from app.core.executor import run_io
 
 router = APIRouter(prefix="/weather", tags=["Weather"])
 
 @router.get("/")
-def get_weather(
+async def get_weather(
     lat: float = Query(default=None),
     lon: float = Query(default=None),
     city: str = Query(default=None)
 ):
-    result = fetch_weather(lat=lat, lon=lon, city=city)
+    result = await run_io(fetch_weather, lat=lat, lon=lon, city=city)
     return result
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Callable, List, Optional
+
+from app.core.executor import run_cpu
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item calls into batches.
+
+    Callers `await submit(item)`; a worker task on the event loop gathers up
+    to `max_batch_size` items (or whatever arrived within `max_wait_ms` of
+    the first one), runs `batch_fn(items)` once on the cpu pool and hands
+    each caller its own entry of the returned list.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 10.0, latency_window: int = 1000):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # metrics
+        self.batch_sizes: Counter = Counter()
+        self.items_processed = 0
+        self._queue_latencies = deque(maxlen=latency_window)  # seconds, most recent items
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done():
+            # created lazily so the queue and task belong to the running loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        await self._queue.put((item, future, loop.time()))
+        return await future
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def stats(self) -> dict:
+        latencies = sorted(self._queue_latencies)
+        pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+        batches = sum(self.batch_sizes.values())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": batches,
+            "items": self.items_processed,
+            "avg_batch_size": round(self.items_processed / batches, 2) if batches else None,
+            "batch_size_distribution": dict(sorted(self.batch_sizes.items())),
+            "queue_latency_ms": {
+                "p50": pct(0.5),
+                "p95": pct(0.95),
+                "max": round(latencies[-1] * 1000, 2),
+            } if latencies else None,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # take whatever is already queued before waiting for more
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            started = loop.time()
+            for _, _, enqueued in batch:
+                self._queue_latencies.append(started - enqueued)
+            self.batch_sizes[len(batch)] += 1
+            self.items_processed += len(batch)
+
+            try:
+                results = await run_cpu(self.batch_fn, [item for item, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():  # caller may have gone away
+                    future.set_result(result)
@@ -9,8 +9,116 @@ class Settings(BaseSettings):
     weather_url: str 
     disease_model_path: str
 
+    # Database engine. Pool sizing applies to server databases and file SQLite; the
+    # sqlite_* pragmas are set on every new SQLite connection (WAL lets readers run
+    # alongside a writer, busy_timeout makes writers wait instead of 'database is locked')
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_s: float = 30.0
+    db_pool_recycle_s: int = 1800
+    db_pool_pre_ping: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_kb: int = 16384
+    sqlite_busy_timeout_ms: int = 5000
+
+    # Sentinel Hub request limits (shared by all NDVI fan-out paths)
+    sh_max_concurrency: int = 4
+    sh_requests_per_second: float = 5.0
+
+    # Output resolution in meters; ndvi_max_pixels > 0 coarsens it for large bboxes
+    # so a single request never exceeds that many pixels
+    ndvi_resolution_m: float = 10
+    ndvi_max_pixels: int = 0
+
+    # Large bboxes are split into tiles of at most this many pixels per side
+    # (Sentinel Hub's limit is 2500) and fetched ndvi_tile_parallelism at a time.
+    # /ndvi/region/analyze refuses areas of more than ndvi_region_max_tiles tiles
+    # (64 tiles of 2048 px at 10 m is about 160 x 160 km); 0 = no limit
+    ndvi_tile_size_px: int = 2048
+    ndvi_tile_parallelism: int = 4
+    ndvi_region_max_tiles: int = 64
+
+    # Nearby fields share one request when they are at most ndvi_coalesce_max_gap_m
+    # apart and the shared raster stays within ndvi_coalesce_max_px per side
+    ndvi_coalesce_max_gap_m: float = 1000
+    ndvi_coalesce_max_px: int = 1024
+
+    # Catalog lookup before NDVI pixel downloads; scenes with more than
+    # ndvi_max_scene_cloud_cover percent cloud (whole tile) count as unusable
+    ndvi_catalog_enabled: bool = True
+    ndvi_max_scene_cloud_cover: float = 95.0
+
+    # Rasterized field polygon masks kept in memory (per field and pixel grid)
+    ndvi_mask_cache_entries: int = 1024
+
+    # NDVI map tiles (/ndvi/tiles/{z}/{x}/{y}.png), only for tiles over the caller's
+    # fields. Zoom 12+ tiles are cut from one zoom-12 metatile at 1024 px (~9.5 m,
+    # about Sentinel-2's native 10 m); lower zooms are averaged down from cached
+    # metatiles, or fetched directly at 256 px when those aren't all cached
+    ndvi_map_tile_meta_zoom: int = 12
+    ndvi_map_tile_metatile_px: int = 1024
+    ndvi_map_tile_min_zoom: int = 10
+    ndvi_map_tile_max_zoom: int = 18
+    ndvi_map_tile_window_days: int = 10
+    ndvi_map_tile_cache_mb: int = 256
+
+    # L2A products can show up a few days after acquisition, so a window only counts
+    # as final (raster/export cache, immutable ETags, stored observations) once it
+    # ended more than ndvi_final_after_days before today
+    ndvi_final_after_days: int = 3
+
+    # Browser caching of /ndvi/image and /ndvi/heatmap: windows that aren't final can
+    # still get a new scene, final windows can't
+    ndvi_image_max_age_s: int = 600
+    ndvi_past_image_max_age_s: int = 604800
+
+    # On-disk raster cache (empty dir -> app/tmp/raster_cache)
+    raster_cache_dir: str = ""
+    raster_cache_max_mb: int = 512
+
+    # Finished NDVI GeoTIFF exports kept on disk (in raster_cache_dir/exports)
+    ndvi_export_cache_mb: int = 256
+
+    # Worker pools for blocking work (cpu_pool_size 0 -> one thread per core)
+    io_pool_size: int = 32
+    cpu_pool_size: int = 0
+
+    # Disease model micro-batching
+    disease_max_batch_size: int = 16
+    disease_max_wait_ms: float = 10.0
+    disease_max_batch_upload: int = 64
+
+    # Disease inference backend: "keras", "tflite" or "auto" (tflite if a model path is set)
+    disease_backend: str = "keras"
+    disease_tflite_model_path: str = ""
+    disease_tflite_threads: int = 0
+
+    # Background NDVI precompute for all fields: stats + heatmap for the dashboard
+    # window (last ndvi_precompute_window_days days), refreshed when a new scene arrives
+    ndvi_precompute_enabled: bool = False
+    ndvi_precompute_interval_minutes: int = 180
+    ndvi_precompute_window_days: int = 30
+    ndvi_precompute_concurrency: int = 2
+    ndvi_precompute_retries: int = 3
+    ndvi_precompute_backoff_s: float = 5.0
+
+    # Password hashing: bcrypt cost (2^rounds; hashes with another cost are redone on
+    # the next successful login) and a bounded pool (0 -> one thread per core) that
+    # queues at most password_queue_size calls before answering 503
+    bcrypt_rounds: int = 12
+    password_pool_size: int = 0
+    password_queue_size: int = 64
+
+    # Validated JWTs -> user kept in memory (never past the token's exp; ttl 0 = off)
+    auth_cache_ttl_s: float = 60.0
+    auth_cache_max_entries: int = 10000
+
+    # Load heavy subsystems (disease model, Sentinel Hub) in the background at startup
+    warm_up_on_startup: bool = True
+
     class Config:
         env_file = ".env"
 
 # Singleton instance you can import
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,17 +1,80 @@
-from sqlalchemy import create_engine # type: ignore
-from sqlalchemy.orm import sessionmaker 
+from sqlalchemy import create_engine, event # type: ignore
+from sqlalchemy.engine import Engine, make_url # type: ignore
+from sqlalchemy.pool import StaticPool # type: ignore
+from sqlalchemy.orm import sessionmaker
 from app.models.db_model import Base # type: ignore
-from sqlalchemy.orm import Session 
-from typing import Generator
+from sqlalchemy.orm import Session
+from typing import AsyncGenerator, Dict, Generator
 import os
 from app.core.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
+# drivers for the async session path (optional dependencies, see requirements.txt)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "mysql": "mysql+aiomysql"}
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return _is_sqlite(url) and make_url(url).database in (None, "", ":memory:")
+
+
+def engine_options(url: str) -> Dict:
+    """create_engine() arguments for the database behind `url`."""
+    if _is_memory_sqlite(url):
+        # one shared connection, otherwise every connection gets its own empty database
+        return {"connect_args": {"check_same_thread": False}, "poolclass": StaticPool}
+    options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_s,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if _is_sqlite(url):
+        # sqlite3's own lock wait, in seconds; the busy_timeout pragma below matches it
+        options["connect_args"] = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000}
+    else:
+        options["pool_recycle"] = settings.db_pool_recycle_s
+    return options
+
+
+def sqlite_pragmas(url: str) -> Dict[str, str]:
+    pragmas = {
+        "synchronous": settings.sqlite_synchronous,
+        "cache_size": str(-settings.sqlite_cache_size_kb),  # negative = KiB rather than pages
+        "busy_timeout": str(settings.sqlite_busy_timeout_ms),
+        "temp_store": "MEMORY",
+    }
+    if not _is_memory_sqlite(url):
+        pragmas = {"journal_mode": settings.sqlite_journal_mode, **pragmas}
+    return pragmas
+
+
+def configure_sqlite(engine: Engine, url: str):
+    """Set the sqlite_* pragmas on every new connection of `engine`."""
+    pragmas = sqlite_pragmas(url)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL) -> Engine:
+    new_engine = create_engine(url, **engine_options(url))
+    if _is_sqlite(url):
+        configure_sqlite(new_engine, url)
+    return new_engine
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db() -> Generator[Session, None, None]:
@@ -20,3 +83,40 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+# Async session path for async routes. Created on first use, so the async
+# driver (aiosqlite / asyncpg) is only needed by deployments that use it.
+_async_session_factory = None
+
+
+def async_database_url(url: str = SQLALCHEMY_DATABASE_URL) -> str:
+    parsed = make_url(url)
+    if "+" in parsed.drivername:
+        return url  # driver given explicitly
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver known for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        url = async_database_url()
+        try:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine # type: ignore
+
+            async_engine = create_async_engine(url, **engine_options(url))
+        except ImportError as e:
+            raise RuntimeError(f"Async database support for {url.split(':')[0]} is not installed: {e}")
+        if _is_sqlite(url):
+            configure_sqlite(async_engine.sync_engine, url)
+        _async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
+
+async def get_async_db() -> AsyncGenerator:
+    """Like get_db, but an AsyncSession (await db.execute(...)) for async routes."""
+    async with get_async_session_factory()() as db:
+        yield db
@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.core.config import settings
+
+# Blocking work is split over pools so a burst of slow satellite downloads
+# can't starve model inference (and vice versa), and the event loop itself only
+# does request routing.
+#
+#  - io pool:  Sentinel Hub downloads, HTTP calls, synchronous DB queries. The
+#    NDVI service calls run here whole, including the raster stats and PNG
+#    encoding that follow their download (the service does both in one call)
+#  - cpu pool: disease image preprocessing and model.predict
+#  - password pool: bcrypt hashing/verification for register and login. Bounded,
+#    so a login burst queues a limited number of calls and the rest are turned
+#    away (Overloaded) instead of piling up and slowing every other route
+#
+# All are thread pools: NumPy, TensorFlow and socket I/O release the GIL, and
+# threads can share the loaded model and DB engine without pickling.
+io_executor = ThreadPoolExecutor(
+    max_workers=settings.io_pool_size,
+    thread_name_prefix="io"
+)
+cpu_executor = ThreadPoolExecutor(
+    max_workers=settings.cpu_pool_size or os.cpu_count() or 1,
+    thread_name_prefix="cpu"
+)
+
+
+class Overloaded(Exception):
+    """A bounded pool's workers and queue are all taken."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool that accepts at most `max_workers + max_queue` calls at a
+    time; submit() raises Overloaded beyond that instead of queueing.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, thread_name_prefix: str):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"{self._pending} calls pending")
+            self._pending += 1
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait: bool = False, cancel_futures: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+password_executor = BoundedExecutor(
+    max_workers=settings.password_pool_size or os.cpu_count() or 1,
+    max_queue=settings.password_queue_size,
+    thread_name_prefix="password"
+)
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking I/O-bound call on the io pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a CPU-bound call on the cpu pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_password(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a password hash/verify on the bounded password pool; raises Overloaded when it's full."""
+    return await asyncio.wrap_future(password_executor.submit(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    cpu_executor.shutdown(wait=False, cancel_futures=True)
+    password_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,53 @@
+import hashlib
+import json
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime
+from typing import Dict, Iterator, Optional, Union
+
+from fastapi import Response # type: ignore
+from fastapi.responses import StreamingResponse # type: ignore
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from anything JSON-serializable that determines the content."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, so W/ prefixes and lists are fine)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def http_date(value: Union[date, datetime]) -> str:
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _chunks(data: memoryview, chunk_size: int) -> Iterator[memoryview]:
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def cached_response(data, headers: Dict[str, str], if_none_match: Optional[str] = None,
+                    media_type: str = "image/png") -> Response:
+    """
+    304 if the client already has this ETag, otherwise `data` (bytes,
+    memoryview or a uint8 array, e.g. a memory-mapped cache entry) streamed
+    in chunks without copying it into one response body first.
+    """
+    if etag_matches(if_none_match, headers.get("ETag", "")):
+        return Response(status_code=304, headers=headers)
+    view = memoryview(data).cast("B")
+    headers = {**headers, "Content-Length": str(len(view))}
+    return StreamingResponse(_chunks(view, STREAM_CHUNK_SIZE), media_type=media_type, headers=headers)
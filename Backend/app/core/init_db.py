@@ -1,8 +1,11 @@
 from app.core.database import Base, engine
+from app.core.migrations import run_migrations
 
 def init_db():
     print("[INIT] Creating all tables...")
     Base.metadata.create_all(bind=engine)
+    print("[INIT] Running migrations...")
+    run_migrations(engine)
     print("[INIT] Done! Database is ready.")
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""
+Schema changes create_all can't do on an existing database.
+
+Each step is idempotent; run them with `python -m app.core.init_db` after
+upgrading.
+"""
+import logging
+
+from sqlalchemy import MetaData, inspect, text # type: ignore
+from sqlalchemy.engine import Connection, Engine # type: ignore
+from sqlalchemy.schema import CreateTable # type: ignore
+
+from app.models import db_model
+
+logger = logging.getLogger(__name__)
+
+BOUND_COLUMNS = ("north", "south", "east", "west")
+
+# SQLite R*Tree over field bounding boxes, kept in sync with `fields` by triggers
+FIELDS_RTREE = "fields_rtree"
+FIELDS_RTREE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FIELDS_RTREE} USING rtree(id, min_lon, max_lon, min_lat, max_lat)",
+    f"""CREATE TRIGGER IF NOT EXISTS fields_rtree_insert AFTER INSERT ON fields BEGIN
+        INSERT INTO {FIELDS_RTREE} VALUES (new.id, new.west, new.east, new.south, new.north);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS fields_rtree_update AFTER UPDATE OF north, south, east, west ON fields BEGIN
+        UPDATE {FIELDS_RTREE} SET min_lon = new.west, max_lon = new.east, min_lat = new.south, max_lat = new.north
+        WHERE id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS fields_rtree_delete AFTER DELETE ON fields BEGIN
+        DELETE FROM {FIELDS_RTREE} WHERE id = old.id;
+    END""",
+    # rows added before the index existed
+    f"""INSERT INTO {FIELDS_RTREE} (id, min_lon, max_lon, min_lat, max_lat)
+        SELECT id, west, east, south, north FROM fields WHERE id NOT IN (SELECT id FROM {FIELDS_RTREE})""",
+]
+
+
+def add_field_geometry(conn: Connection):
+    """Optional polygon column on `fields`."""
+    inspector = inspect(conn)
+    if not inspector.has_table("fields"):
+        return
+    if "geometry" not in {c["name"] for c in inspector.get_columns("fields")}:
+        logger.info("Adding fields.geometry")
+        conn.execute(text("ALTER TABLE fields ADD COLUMN geometry TEXT"))
+
+
+def migrate_field_bounds(conn: Connection):
+    """Turn the String north/south/east/west columns of `fields` into floats."""
+    inspector = inspect(conn)
+    if not inspector.has_table("fields"):
+        return
+    types = {c["name"]: str(c["type"]).upper() for c in inspector.get_columns("fields")}
+    if not any("CHAR" in types.get(name, "") or "TEXT" in types.get(name, "") for name in BOUND_COLUMNS):
+        return
+
+    logger.info("Migrating fields bounds to numeric columns")
+    if conn.dialect.name == "sqlite":
+        # SQLite can't change a column type: copy into a new table and swap it in
+        table = db_model.Field.__table__
+        metadata = MetaData()
+        db_model.User.__table__.to_metadata(metadata)  # target of the user_id foreign key
+        new_table = table.to_metadata(metadata, name="fields_new")
+        columns = ", ".join(c.name for c in table.columns)
+        select = ", ".join(
+            f"CAST({c.name} AS REAL)" if c.name in BOUND_COLUMNS else c.name for c in table.columns
+        )
+        conn.execute(text("DROP TABLE IF EXISTS fields_new"))
+        conn.execute(CreateTable(new_table))
+        conn.execute(text(f"INSERT INTO fields_new ({columns}) SELECT {select} FROM fields"))
+        conn.execute(text("DROP TABLE fields"))
+        conn.execute(text("ALTER TABLE fields_new RENAME TO fields"))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    else:
+        for name in BOUND_COLUMNS:
+            conn.execute(text(
+                f"ALTER TABLE fields ALTER COLUMN {name} TYPE DOUBLE PRECISION USING {name}::double precision"
+            ))
+
+
+def ensure_field_spatial_index(conn: Connection):
+    """R*Tree on SQLite, a plain composite index elsewhere."""
+    if conn.dialect.name == "sqlite":
+        for statement in FIELDS_RTREE_DDL:
+            conn.execute(text(statement))
+    else:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_fields_bounds ON fields (west, east, south, north)"))
+
+
+def run_migrations(engine: Engine):
+    with engine.begin() as conn:
+        add_field_geometry(conn)  # before the bounds rebuild, which copies every model column
+        migrate_field_bounds(conn)
+        ensure_field_spatial_index(conn)
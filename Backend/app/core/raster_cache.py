@@ -0,0 +1,149 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Default location: Backend/app/tmp/raster_cache
+DEFAULT_CACHE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tmp", "raster_cache")
+)
+
+
+class RasterCache:
+    """
+    Content-addressed on-disk cache for Sentinel Hub rasters.
+
+    Entries are plain `.npy` files named by a hash of the request
+    (bbox, time interval, evalscript, size, format) and are read back with
+    `mmap_mode="r"`, so a hit costs no copy. The total size on disk is kept
+    under `max_bytes` by evicting the least recently used entries.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(bbox: Sequence[float], time_interval: Tuple[str, str], evalscript: str,
+                 size: Tuple[int, int], fmt: str = "") -> str:
+        evalscript_hash = hashlib.sha256(evalscript.encode("utf-8")).hexdigest()
+        payload = json.dumps({
+            "bbox": [round(float(v), 7) for v in bbox],
+            "time_interval": list(time_interval),
+            "evalscript": evalscript_hash,
+            "size": [int(v) for v in size],
+            "format": fmt,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        path = self._path(key)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            array = np.load(path, mmap_mode="r")
+            os.utime(path)  # keeps LRU order across restarts
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable raster cache entry {key}: {e}")
+            self._forget(key)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return array
+
+    def put(self, key: str, array: np.ndarray) -> np.ndarray:
+        array = np.asarray(array)
+        if array.size == 0:
+            return array  # empty files can't be memory-mapped, nothing worth caching
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+        self._evict()
+        return array
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], np.ndarray]) -> np.ndarray:
+        """Read-through: return the cached raster or fetch, store and return it."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        return self.put(key, fetch())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                # leftover from an interrupted write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if name.endswith(".npy"):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError as e:
+                # e.g. still memory-mapped by a reader on Windows; it'll be retried on next start
+                logger.debug(f"Could not evict raster cache entry {key}: {e}")
@@ -0,0 +1,33 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    acquire() blocks until a token is available, so callers running in a
+    thread pool never go over `rate` calls per second (with bursts of up to
+    `burst` calls).
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return  # limiting disabled
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyResource:
+    """
+    A heavy dependency (ML model, SDK client) loaded on first use.
+
+    get() loads it once, thread-safely, and returns the cached value. The
+    load state is kept so /health can report readiness per subsystem. A
+    failed load is retried on the next get().
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._value: Any = None
+        self._lock = threading.Lock()
+        self.state = "not_loaded"  # not_loaded | loading | ready | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    def get(self) -> Any:
+        if self.state == "ready":
+            return self._value
+        with self._lock:
+            if self.state != "ready":
+                self.state = "loading"
+                started = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                except Exception as e:
+                    self.state = "failed"
+                    self.error = str(e)
+                    logger.error(f"Loading {self.name} failed: {e}")
+                    raise
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                self.error = None
+                self.state = "ready"
+                logger.info(f"Loaded {self.name} in {self.load_seconds}s")
+        return self._value
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def status(self) -> dict:
+        status = {"state": self.state}
+        if self.load_seconds is not None:
+            status["load_seconds"] = self.load_seconds
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+_resources: Dict[str, LazyResource] = {}
+
+
+def lazy_resource(name: str, loader: Callable[[], Any]) -> LazyResource:
+    """Create and register a lazily loaded subsystem."""
+    resource = LazyResource(name, loader)
+    _resources[name] = resource
+    return resource
+
+
+def readiness() -> Dict[str, dict]:
+    return {name: resource.status() for name, resource in _resources.items()}
+
+
+def warm_up(names: Optional[Iterable[str]] = None):
+    """Load the given (default: all) subsystems in background threads."""
+    for name in (names or list(_resources)):
+        resource = _resources[name]
+
+        def load(resource=resource):
+            try:
+                resource.get()
+            except Exception:
+                pass  # already logged and recorded in status()
+
+        threading.Thread(target=load, name=f"warm-up-{name}", daemon=True).start()
@@ -8,6 +8,7 @@ import os
 from app.core.database import get_db
 from app.models import db_model
 from app.core.config import Settings
+from app.core.token_cache import TokenCache
 
 settings = Settings()
 
@@ -18,6 +19,9 @@ ALGORITHM = "HS256"
 # ✅ SINGLE, global declaration of oauth2_scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+# Recently validated tokens -> user, so repeat requests skip the JWT decode and the DB
+token_cache = TokenCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_s)
+
 def get_current_user(
     db: Annotated[Session, Depends(get_db)],
     token: str = Depends(oauth2_scheme)
@@ -25,7 +29,15 @@ def get_current_user(
     """
     Decode JWT token, find user in DB, return user.
     Raises 401 if token invalid or user not found.
+
+    Tokens validated in the last auth_cache_ttl_s seconds (and not expired)
+    are answered from token_cache. The user is detached from the session,
+    so routes only read its columns (e.g. current_user.id).
     """
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -41,7 +53,8 @@ def get_current_user(
 
     # user_id is string → cast to int
     user = db.query(db_model.User).filter(db_model.User.id == int(user_id)).first()
-    print("DECODE SECRET_KEY:", SECRET_KEY)
     if user is None:
         raise credentials_exception
+    db.expunge(user)  # shared with later requests through the cache
+    token_cache.put(token, user, payload.get("exp"))
     return user
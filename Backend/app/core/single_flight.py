@@ -0,0 +1,64 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs fn(); callers arriving while it is in
+    flight wait and get the same result (or exception) instead of running
+    it again. Nothing is kept once the call finishes, so this is not a
+    cache, only in-flight deduplication.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.executed + self.shared
+            return {
+                "calls": calls,
+                "executed": self.executed,  # leader calls; fn() may still be answered by a cache
+                "shared": self.shared,  # callers that joined an identical in-flight call
+                "saved_ratio": round(self.shared / calls, 3) if calls else None,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class TokenCache:
+    """
+    Validated bearer token -> user, so most authenticated requests skip the
+    JWT decode and the users query.
+
+    An entry lives at most `ttl_s` seconds and never past the token's own
+    `exp`. Beyond `max_entries` the least recently used tokens are dropped.
+    There is no per-user invalidation: a changed or deleted account is seen
+    once its entries expire, after at most `ttl_s`. ttl_s <= 0 turns the
+    cache off.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 60.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()  # token -> (user, expires_at)
+
+    def get(self, token: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return user
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, user: Any, token_expires_at: Optional[float] = None):
+        """Cache `user` for `token`; token_expires_at is the JWT `exp` (epoch seconds)."""
+        if self.ttl_s <= 0:
+            return
+        expires_at = time.time() + self.ttl_s
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+            }
@@ -2,12 +2,36 @@ from fastapi import FastAPI # type: ignore
 from app.apis import NDVI_api, auth_api, fields_api, weather_api,disease_api  # Import your NDVI router
 # from app.api import disease, auth  # Your other routers
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from app.core.executor import shutdown_executors, password_executor
+from app.core.readiness import readiness, warm_up
+from app.core.config import settings
+from app.core.init_db import init_db
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create missing tables (NDVI store, snapshots, ...) and run migrations, so an
+    # existing database keeps working after an upgrade without a manual step
+    init_db()
+    # Load the disease model / Sentinel Hub client in the background so the
+    # worker starts serving right away; /health reports when they're ready
+    if settings.warm_up_on_startup:
+        warm_up()
+    if settings.ndvi_precompute_enabled:
+        NDVI_api.precompute_scheduler.start()
+    yield
+    NDVI_api.precompute_scheduler.stop()
+    await disease_api.disease_batcher.close()
+    # Stop the io/cpu worker pools used by the async routes
+    shutdown_executors()
 
 
 app = FastAPI(
     title="Agricultural Monitoring API",
     description="API for disease detection and NDVI analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -31,4 +55,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "agricultural-monitoring-api"}
\ No newline at end of file
+    subsystems = readiness()
+    return {
+        "status": "healthy",
+        "service": "agricultural-monitoring-api",
+        "ready": all(s["state"] == "ready" for s in subsystems.values()),
+        "subsystems": subsystems,
+        "password_pool": password_executor.stats()
+    }
\ No newline at end of file
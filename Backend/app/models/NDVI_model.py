@@ -18,6 +18,7 @@ class NDVIRequest(BaseModel):
     west: Optional[float] = None
     start_date: str
     end_date: str
+    geometry: Optional[Dict] = None  # GeoJSON polygon: stats only over pixels inside it
 
 class NDVIResponse(BaseModel):
     latitude: Optional[float]   # May be None if using bbox
@@ -48,7 +49,14 @@ class NDVIFieldRequest(BaseModel):
     start_date: str
     end_date: str
 
+class NDVIFieldsRequest(BaseModel):
+    """Request model for NDVI analysis of several fields at once"""
+    field_ids: Optional[List[int]] = None  # None -> all of the user's fields
+    start_date: str
+    end_date: str
+
 class NDVIHistoryRequest(BaseModel):
     field_id: int
     days: int 
-    step_days: int 
\ No newline at end of file
+    step_days: int 
+    mode: str = "timeseries"  # "timeseries" (one multi-temporal request) or "windows" (one request per step)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime # type: ignore 
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Float, UniqueConstraint, Text, LargeBinary # type: ignore 
 from sqlalchemy.orm import relationship, declarative_base # type: ignore
 from datetime import datetime
 
@@ -22,10 +22,54 @@ class Field(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     name = Column(String, nullable=False)
-    north = Column(String, nullable=False)
-    south = Column(String, nullable=False)
-    east = Column(String, nullable=False)
-    west = Column(String, nullable=False)
+    north = Column(Float, nullable=False)
+    south = Column(Float, nullable=False)
+    east = Column(Float, nullable=False)
+    west = Column(Float, nullable=False)
+    geometry = Column(Text, nullable=True)  # optional GeoJSON Polygon/MultiPolygon (lon, lat)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     owner = relationship("User", back_populates="fields")
+
+
+class NDVIObservation(Base):
+    """Per-field NDVI stats for one Sentinel-2 acquisition date."""
+    __tablename__ = "ndvi_observations"
+    __table_args__ = (
+        # also serves as the (field_id, date) index for history queries
+        UniqueConstraint("field_id", "date", name="uq_ndvi_observations_field_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    field_id = Column(Integer, ForeignKey("fields.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    ndvi_value = Column(Float, nullable=False)  # median
+    average_ndvi = Column(Float)
+    min_ndvi = Column(Float)
+    max_ndvi = Column(Float)
+    vegetation_health = Column(String)
+    valid_pixel_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class NDVISyncState(Base):
+    """Date range already fetched from Sentinel Hub for a field (including dates with no usable scene)."""
+    __tablename__ = "ndvi_sync_state"
+
+    field_id = Column(Integer, ForeignKey("fields.id"), primary_key=True)
+    covered_from = Column(Date, nullable=False)
+    covered_until = Column(Date, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class NDVISnapshot(Base):
+    """Precomputed NDVI stats + heatmap for a field's dashboard window (see NDVI_precompute)."""
+    __tablename__ = "ndvi_snapshots"
+
+    field_id = Column(Integer, ForeignKey("fields.id"), primary_key=True)
+    start_date = Column(String, nullable=False)
+    end_date = Column(String, nullable=False)
+    acquisition_date = Column(Date)  # newest catalog acquisition in the window when computed
+    analysis = Column(Text, nullable=False)  # NDVIResponse as JSON
+    heatmap_png = Column(LargeBinary, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
@@ -1,4 +1,7 @@
-from pydantic import BaseModel # type: ignore
+import json
+from typing import Dict, Optional
+
+from pydantic import BaseModel, field_validator # type: ignore
 
 class FieldCreate(BaseModel):
     name: str
@@ -6,6 +9,23 @@ class FieldCreate(BaseModel):
     south: float
     east: float
     west: float
+    geometry: Optional[Dict] = None  # GeoJSON Polygon/MultiPolygon, [lon, lat] positions
+
+    @field_validator("geometry")
+    @classmethod
+    def check_geometry(cls, geometry):
+        if geometry is None:
+            return geometry
+        if geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            raise ValueError("geometry must be a GeoJSON Polygon or MultiPolygon")
+        polygons = [geometry.get("coordinates")] if geometry["type"] == "Polygon" else geometry.get("coordinates")
+        try:
+            ok = all(len(ring) >= 4 and all(len(p) >= 2 for p in ring) for polygon in polygons for ring in polygon)
+        except TypeError:
+            ok = False
+        if not polygons or not ok:
+            raise ValueError("geometry rings need at least 4 [lon, lat] positions")
+        return geometry
 
 class FieldOut(BaseModel):
     id: int
@@ -14,6 +34,13 @@ class FieldOut(BaseModel):
     south: float
     east: float
     west: float
+    geometry: Optional[Dict] = None
+
+    @field_validator("geometry", mode="before")
+    @classmethod
+    def parse_geometry(cls, geometry):
+        # stored as GeoJSON text on db_model.Field
+        return json.loads(geometry) if isinstance(geometry, str) else geometry
 
     class Config:
         from_attributes = True
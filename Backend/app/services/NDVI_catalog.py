@@ -0,0 +1,73 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sentinelhub import BBox, DataCollection, SentinelHubCatalog, SHConfig  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class SceneCatalog:
+    """
+    Sentinel-2 L2A acquisitions for a bbox and window, from the Catalog API.
+
+    Catalog lookups are cheap metadata queries, so they run before any
+    pixel download: windows with no scene (or only scenes above
+    `max_cloud_cover` percent) are answered without downloading anything,
+    and the others are narrowed to the span of their usable scenes. The
+    counters say how many pixel downloads that avoided.
+    """
+
+    def __init__(self, config: SHConfig, max_cloud_cover: float = 100.0):
+        self._catalog = SentinelHubCatalog(config=config)
+        self.max_cloud_cover = max_cloud_cover
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.downloads = 0
+        self.downloads_avoided = 0
+
+    def acquisitions(self, bbox: BBox, start_date: str, end_date: str) -> List[Dict]:
+        """One {"date", "cloud_cover"} per acquisition date (clearest if several), oldest first."""
+        with self._lock:
+            self.queries += 1
+        results = self._catalog.search(
+            DataCollection.SENTINEL2_L2A,
+            bbox=bbox,
+            time=(start_date, end_date),
+            fields={"include": ["id", "properties.datetime", "properties.eo:cloud_cover"], "exclude": []}
+        )
+        by_date: Dict[str, float] = {}
+        for feature in results:
+            properties = feature["properties"]
+            date = properties["datetime"][:10]
+            cloud_cover = float(properties.get("eo:cloud_cover", 0.0))
+            by_date[date] = min(cloud_cover, by_date.get(date, cloud_cover))
+        return [{"date": date, "cloud_cover": by_date[date]} for date in sorted(by_date)]
+
+    def usable(self, acquisitions: List[Dict]) -> List[Dict]:
+        return [a for a in acquisitions if a["cloud_cover"] <= self.max_cloud_cover]
+
+    def usable_range(self, acquisitions: List[Dict]) -> Optional[Tuple[str, str]]:
+        """
+        (oldest, newest) usable acquisition date, or None if there's none.
+        The whole span is kept so the mostRecent mosaic can still fill cloudy
+        pixels of the newest scene from earlier passes.
+        """
+        usable = self.usable(acquisitions)
+        return (usable[0]["date"], usable[-1]["date"]) if usable else None
+
+    def record(self, downloaded: int = 0, avoided: int = 0):
+        with self._lock:
+            self.downloads += downloaded
+            self.downloads_avoided += avoided
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.downloads + self.downloads_avoided
+            return {
+                "catalog_queries": self.queries,
+                "pixel_downloads": self.downloads,
+                "pixel_downloads_avoided": self.downloads_avoided,
+                "avoided_ratio": round(self.downloads_avoided / total, 3) if total else None,
+                "max_cloud_cover": self.max_cloud_cover,
+            }
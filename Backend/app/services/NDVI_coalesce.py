@@ -0,0 +1,97 @@
+import math
+from typing import Dict, List, Sequence, Tuple
+
+from sentinelhub import BBox, CRS  # type: ignore
+
+from app.services.NDVI_geometry import output_dimensions
+from app.services.NDVI_tiling import SH_MAX_OUTPUT_PX
+
+# Meters per degree of latitude / of longitude at the equator
+M_PER_DEG_LAT = 110_574
+M_PER_DEG_LON = 111_320
+
+
+def _bounds(field) -> Tuple[float, float, float, float]:
+    return field.west, field.south, field.east, field.north
+
+
+def _union(a: Sequence[float], b: Sequence[float]) -> List[float]:
+    return [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+
+
+def _gap_m(a: Sequence[float], b: Sequence[float]) -> float:
+    """Distance in meters between two WGS84 boxes (0 when they touch or overlap)."""
+    dx = max(0.0, a[0] - b[2], b[0] - a[2])
+    dy = max(0.0, a[1] - b[3], b[1] - a[3])
+    lat = math.radians((a[1] + a[3] + b[1] + b[3]) / 4)
+    return math.hypot(dx * M_PER_DEG_LON * math.cos(lat), dy * M_PER_DEG_LAT)
+
+
+def _max_side_px(bounds: Sequence[float], resolution: float) -> int:
+    (width, height), _ = output_dimensions(BBox(list(bounds), crs=CRS.WGS84), resolution)
+    return max(width, height)
+
+
+def plan_field_groups(fields: Sequence, max_gap_m: float, max_side_px: int, resolution: float) -> List[Dict]:
+    """
+    Group fields so nearby ones can share one Sentinel Hub request.
+
+    Fields are visited west to east; each joins the group it is closest to
+    (within `max_gap_m`) as long as the group's covering bbox stays at most
+    `max_side_px` pixels on either side, otherwise it starts a new group.
+    Fields may be any objects with id/north/south/east/west.
+
+    Returns a list of {"field_ids": [...], "bbox": [west, south, east, north]}.
+    """
+    groups: List[Dict] = []
+    for field in sorted(fields, key=lambda f: (f.west, f.south)):
+        bounds = _bounds(field)
+        best, best_growth = None, None
+        for group in groups:
+            if _gap_m(group["bbox"], bounds) > max_gap_m:
+                continue
+            union = _union(group["bbox"], bounds)
+            if _max_side_px(union, resolution) > max_side_px:
+                continue
+            growth = (union[2] - union[0]) * (union[3] - union[1])
+            if best is None or growth < best_growth:
+                best, best_growth = group, growth
+        if best is None:
+            groups.append({"field_ids": [field.id], "bbox": list(bounds)})
+        else:
+            best["field_ids"].append(field.id)
+            best["bbox"] = _union(best["bbox"], bounds)
+    return groups
+
+
+def field_window(bbox: BBox, size: Tuple[int, int], bounds: Sequence[float]) -> Tuple[slice, slice]:
+    """
+    (rows, cols) slices of a raster covering `bbox` at `size` whose pixel
+    centers fall inside `bounds` (at least one pixel, rows from the north edge).
+    """
+    width, height = size
+    deg_per_col = (bbox.max_x - bbox.min_x) / width
+    deg_per_row = (bbox.max_y - bbox.min_y) / height
+    west, south, east, north = bounds
+
+    col0 = math.ceil((west - bbox.min_x) / deg_per_col - 0.5)
+    col1 = math.ceil((east - bbox.min_x) / deg_per_col - 0.5)
+    row0 = math.ceil((bbox.max_y - north) / deg_per_row - 0.5)
+    row1 = math.ceil((bbox.max_y - south) / deg_per_row - 0.5)
+
+    col0, row0 = min(max(col0, 0), width - 1), min(max(row0, 0), height - 1)
+    col1, row1 = max(min(col1, width), col0 + 1), max(min(row1, height), row0 + 1)
+    return slice(row0, row1), slice(col0, col1)
+
+
+def requests_without_coalescing(fields: Sequence, resolution: float, tile_size_px: int, max_pixels: int = 0) -> int:
+    """Upstream requests calculate_ndvi would make for the fields one by one (tiles included)."""
+    tile_px = max(1, min(tile_size_px, SH_MAX_OUTPUT_PX))
+    total = 0
+    for field in fields:
+        (width, height), _ = output_dimensions(BBox(list(_bounds(field)), crs=CRS.WGS84), resolution, max_pixels)
+        if max(width, height) > tile_size_px:
+            total += math.ceil(width / tile_px) * math.ceil(height / tile_px)
+        else:
+            total += 1
+    return total
@@ -0,0 +1,30 @@
+import math
+from typing import Tuple
+from sentinelhub import BBox, bbox_to_dimensions  # type: ignore
+
+# Sentinel-2 B04/B08 native resolution
+DEFAULT_RESOLUTION_M = 10
+
+
+def output_dimensions(bbox: BBox, resolution: float = DEFAULT_RESOLUTION_M,
+                      max_pixels: int = 0) -> Tuple[Tuple[int, int], float]:
+    """
+    Output (width, height) in pixels for a WGS84 bbox at `resolution` meters.
+
+    The bbox is projected to its UTM zone (sentinelhub.bbox_to_dimensions),
+    so east-west size shrinks with cos(latitude) instead of assuming
+    111.32 km per degree on both axes. If `max_pixels` is set and the bbox
+    would need more pixels than that, the resolution is coarsened just enough
+    to fit the budget.
+
+    Returns ((width, height), resolution actually used).
+    """
+    width, height = bbox_to_dimensions(bbox, resolution=resolution)
+    if max_pixels and width * height > max_pixels:
+        resolution = resolution * math.sqrt(width * height / max_pixels)
+        width, height = bbox_to_dimensions(bbox, resolution=resolution)
+        # rounding can land a pixel or two over the budget
+        while width * height > max_pixels and (width > 1 or height > 1):
+            resolution *= 1.01
+            width, height = bbox_to_dimensions(bbox, resolution=resolution)
+    return (max(1, width), max(1, height)), resolution
@@ -0,0 +1,238 @@
+import logging
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.NDVI_tiles import downsample
+
+logger = logging.getLogger(__name__)
+
+COG_TILE_SIZE = 256
+
+# TIFF field types
+SHORT, LONG, ASCII, DOUBLE = 3, 4, 2, 12
+_TYPE_FORMAT = {SHORT: "H", LONG: "I", ASCII: "s", DOUBLE: "d"}
+_TYPE_SIZE = {SHORT: 2, LONG: 4, ASCII: 1, DOUBLE: 8}
+
+
+def _overview_levels(ndvi_array: np.ndarray, tile_size: int) -> List[np.ndarray]:
+    """Full resolution first, then 2x averaged overviews until one fits in a tile."""
+    levels = [np.asarray(ndvi_array, dtype=np.float32)]
+    while max(levels[-1].shape) > tile_size:
+        level = levels[-1]
+        height, width = level.shape
+        if height % 2 or width % 2:
+            level = np.pad(level, ((0, height % 2), (0, width % 2)), constant_values=np.nan)
+        levels.append(downsample(level, 2))
+    return levels
+
+
+def _tiles(level: np.ndarray, tile_size: int):
+    """Row-major tiles, edge tiles padded with NaN (TIFF tiles are always full size)."""
+    height, width = level.shape
+    for row in range(0, height, tile_size):
+        for col in range(0, width, tile_size):
+            tile = level[row:row + tile_size, col:col + tile_size]
+            if tile.shape != (tile_size, tile_size):
+                tile = np.pad(tile, ((0, tile_size - tile.shape[0]), (0, tile_size - tile.shape[1])),
+                              constant_values=np.nan)
+            yield tile
+
+
+def _tile_count(shape: Tuple[int, int], tile_size: int) -> int:
+    return math.ceil(shape[0] / tile_size) * math.ceil(shape[1] / tile_size)
+
+
+def _ifd_tags(level: np.ndarray, tile_size: int, overview: bool, offsets: Sequence[int], byte_counts: Sequence[int],
+              geo: Optional[List[Tuple]]) -> List[Tuple]:
+    height, width = level.shape
+    tags = [
+        (254, LONG, [1 if overview else 0]),  # NewSubfileType: reduced resolution image
+        (256, LONG, [width]),
+        (257, LONG, [height]),
+        (258, SHORT, [32]),  # BitsPerSample
+        (259, SHORT, [8]),  # Compression: Deflate
+        (262, SHORT, [1]),  # Photometric: min-is-black
+        (277, SHORT, [1]),  # SamplesPerPixel
+        (284, SHORT, [1]),  # PlanarConfiguration: contiguous
+        (322, SHORT, [tile_size]),
+        (323, SHORT, [tile_size]),
+        (324, LONG, list(offsets)),
+        (325, LONG, list(byte_counts)),
+        (339, SHORT, [3]),  # SampleFormat: IEEE float
+    ]
+    return sorted(tags + (geo or []))
+
+
+def _geo_tags(bounds: Sequence[float], shape: Tuple[int, int]) -> List[Tuple]:
+    """GeoTIFF tags placing the raster in WGS84 (EPSG:4326) with `bounds` = west, south, east, north."""
+    west, south, east, north = bounds
+    height, width = shape
+    geo_keys = [
+        1, 1, 0, 3,  # version 1.1.0, 3 keys
+        1024, 0, 1, 2,  # GTModelType: geographic
+        1025, 0, 1, 1,  # GTRasterType: PixelIsArea
+        2048, 0, 1, 4326,  # GeographicType: WGS84
+    ]
+    return [
+        (33550, DOUBLE, [(east - west) / width, (north - south) / height, 0.0]),  # ModelPixelScale
+        (33922, DOUBLE, [0.0, 0.0, 0.0, west, north, 0.0]),  # ModelTiepoint
+        (34735, SHORT, geo_keys),  # GeoKeyDirectory
+        (42113, ASCII, [b"nan\0"]),  # GDAL_NODATA
+    ]
+
+
+def _value_bytes(field_type: int, values) -> bytes:
+    if field_type == ASCII:
+        return values[0]
+    return struct.pack(f"<{len(values)}{_TYPE_FORMAT[field_type]}", *values)
+
+
+def _encode_ifds(ifds: List[List[Tuple]], start: int) -> bytes:
+    """
+    All IFDs back to back from file offset `start`, followed by the values
+    that don't fit in an entry. The size only depends on the tag layout,
+    not on the tile offsets/byte counts, so it can be computed up front.
+    """
+    ifd_sizes = [2 + 12 * len(tags) + 4 for tags in ifds]
+    extra_offset = start + sum(ifd_sizes)
+    ifd_data, extra = bytearray(), bytearray()
+    for i, tags in enumerate(ifds):
+        ifd_data += struct.pack("<H", len(tags))
+        for tag, field_type, values in tags:
+            data = _value_bytes(field_type, values)
+            count = len(data) // _TYPE_SIZE[field_type]
+            if len(data) <= 4:
+                ifd_data += struct.pack("<HHI", tag, field_type, count) + data.ljust(4, b"\0")
+            else:
+                ifd_data += struct.pack("<HHII", tag, field_type, count, extra_offset + len(extra))
+                extra += data
+                if len(extra) % 2:
+                    extra += b"\0"  # values start on a word boundary
+        next_ifd = start + sum(ifd_sizes[:i + 1]) if i + 1 < len(ifds) else 0
+        ifd_data += struct.pack("<I", next_ifd)
+    return bytes(ifd_data + extra)
+
+
+def write_cog(path: str, ndvi_array: np.ndarray, bounds: Sequence[float], tile_size: int = COG_TILE_SIZE,
+              compression_level: int = 6) -> int:
+    """
+    Write an NDVI raster as a cloud-optimized GeoTIFF: float32, deflate
+    compressed 256 px tiles, 2x overviews, NaN as no data, EPSG:4326.
+
+    COG layout: all IFDs come first, then the overview tiles (smallest
+    first) and the full resolution tiles last, so a client can read the
+    whole header with one range request and then only the tiles it needs.
+    Tiles are compressed and written one at a time; the header is written
+    last into the space reserved for it. Returns the file size.
+    """
+    levels = _overview_levels(ndvi_array, tile_size)
+    geo = _geo_tags(bounds, levels[0].shape)
+
+    # the header's size doesn't depend on the offsets, so lay it out with placeholders first
+    placeholder = [
+        _ifd_tags(level, tile_size, i > 0, [0] * _tile_count(level.shape, tile_size),
+                  [0] * _tile_count(level.shape, tile_size), geo if i == 0 else None)
+        for i, level in enumerate(levels)
+    ]
+    header_size = 8 + len(_encode_ifds(placeholder, 8))
+
+    offsets: List[List[int]] = [[] for _ in levels]
+    byte_counts: List[List[int]] = [[] for _ in levels]
+    with open(path, "wb") as f:
+        f.seek(header_size)
+        position = header_size
+        for i in reversed(range(len(levels))):
+            for tile in _tiles(levels[i], tile_size):
+                data = zlib.compress(np.ascontiguousarray(tile, dtype="<f4").tobytes(), compression_level)
+                f.write(data)
+                offsets[i].append(position)
+                byte_counts[i].append(len(data))
+                position += len(data)
+
+        ifds = [
+            _ifd_tags(level, tile_size, i > 0, offsets[i], byte_counts[i], geo if i == 0 else None)
+            for i, level in enumerate(levels)
+        ]
+        header = b"II" + struct.pack("<HI", 42, 8) + _encode_ifds(ifds, 8)
+        assert len(header) == header_size
+        f.seek(0)
+        f.write(header)
+    return position
+
+
+class GeoTIFFExportCache:
+    """
+    Finished GeoTIFF exports on disk, keyed like the raster cache, so the
+    range requests of a GIS client read the same file instead of
+    rebuilding it. Oldest files are removed beyond `max_bytes`.
+
+    Exports that can still change are written with a `ttl_s`; they are
+    rebuilt once that has passed (and after a restart, since their write
+    times are only kept in memory).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._written: Dict[str, float] = {}  # key -> time.monotonic() of the last write
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.tif")
+
+    def get(self, key: str, ttl_s: Optional[float] = None) -> Optional[str]:
+        """Path of the cached export, or None if there's none (or it's older than ttl_s)."""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        if ttl_s is not None:
+            with self._lock:
+                written = self._written.get(key)
+            if written is None or time.monotonic() - written >= ttl_s:
+                return None
+        os.utime(path)  # most recently used
+        return path
+
+    def get_or_write(self, key: str, write: Callable[[str], None], ttl_s: Optional[float] = None) -> str:
+        path = self.get(key, ttl_s)
+        if path is not None:
+            return path
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)  # readers of an expired copy keep their open file
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._written[key] = time.monotonic()
+        self._prune()
+        return path
+
+    def _prune(self):
+        with self._lock:
+            files = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".tif"):
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                    files.append((stat.st_mtime, name, stat.st_size))
+            total = sum(size for _, _, size in files)
+            for _, name, size in sorted(files)[:-1]:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    self._written.pop(name[:-len(".tif")], None)
+                    total -= size
+                except OSError as e:
+                    logger.debug(f"Could not remove GeoTIFF export {name}: {e}")
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+POLYGON_TYPES = ("Polygon", "MultiPolygon")
+
+
+def geometry_rings(geometry: Dict) -> List[np.ndarray]:
+    """All rings (outer and holes) of a GeoJSON Polygon/MultiPolygon as (N, 2) lon/lat arrays."""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError(f"Unsupported geometry type {geometry['type']}")
+    return [np.asarray(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon]
+
+
+def rasterize_rings(rings: List[np.ndarray], bounds, size: Tuple[int, int],
+                    rows: slice = slice(None), cols: slice = slice(None)) -> np.ndarray:
+    """
+    Boolean mask of the pixels whose centers are inside the polygon (even-odd rule,
+    so holes and multipolygons work) for a raster covering `bounds`
+    [west, south, east, north] at `size` (width, height), rows from the north edge.
+    `rows`/`cols` restrict it to a window of that raster.
+
+    Scanline fill: the crossings of every pixel-row center line with every
+    polygon edge are computed in one vectorized step, then filled pairwise.
+    """
+    west, south, east, north = bounds
+    width, height = size
+    row_idx = np.arange(height)[rows]
+    col_idx = np.arange(width)[cols]
+    deg_per_col = (east - west) / width
+    deg_per_row = (north - south) / height
+    mask = np.zeros((len(row_idx), len(col_idx)), dtype=bool)
+    if mask.size == 0:
+        return mask
+
+    edges = np.concatenate([np.stack([ring[:-1], ring[1:]], axis=1) for ring in rings if len(ring) > 1])
+    x0, y0 = edges[:, 0, 0], edges[:, 0, 1]
+    x1, y1 = edges[:, 1, 0], edges[:, 1, 1]
+
+    y = north - (row_idx + 0.5) * deg_per_row  # row center latitudes
+    yy = y[:, np.newaxis]
+    # half-open test so a vertex shared by two edges is only counted once
+    crosses = (y0 <= yy) != (y1 <= yy)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = x0 + (yy - y0) * (x1 - x0) / (y1 - y0)
+    x = np.where(crosses, x, np.inf)
+    x.sort(axis=1)
+    counts = crosses.sum(axis=1)
+
+    first_col = col_idx[0]
+    for r in np.nonzero(counts)[0]:
+        xs = x[r, :counts[r]]
+        for xa, xb in zip(xs[0::2], xs[1::2]):
+            # columns whose center lies in [xa, xb)
+            c0 = max(math.ceil((xa - west) / deg_per_col - 0.5) - first_col, 0)
+            c1 = min(math.ceil((xb - west) / deg_per_col - 0.5) - first_col, mask.shape[1])
+            if c1 > c0:
+                mask[r, c0:c1] = True
+    return mask
+
+
+class MaskCache:
+    """
+    In-memory LRU of rasterized field masks, keyed by geometry and pixel grid.
+
+    A field analysed again on the same grid (same bbox, size and window)
+    reuses its mask instead of rasterizing the polygon again.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._masks: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    @staticmethod
+    def make_key(geometry: Dict, bounds, size: Tuple[int, int], rows: slice, cols: slice) -> str:
+        payload = json.dumps({
+            "geometry": geometry,
+            "bounds": [round(float(v), 7) for v in bounds],
+            "size": [int(v) for v in size],
+            "window": [rows.start, rows.stop, cols.start, cols.stop],
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, geometry: Dict, bounds, size: Tuple[int, int],
+            rows: slice = slice(None), cols: slice = slice(None)) -> np.ndarray:
+        key = self.make_key(geometry, bounds, size, rows, cols)
+        with self._lock:
+            mask: Optional[np.ndarray] = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                self.hits += 1
+                return mask
+            self.misses += 1
+
+        mask = rasterize_rings(geometry_rings(geometry), bounds, size, rows, cols)
+        mask.setflags(write=False)  # shared between requests
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.max_entries:
+                self._masks.popitem(last=False)
+        return mask
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": len(self._masks),
+                "max_entries": self.max_entries,
+            }
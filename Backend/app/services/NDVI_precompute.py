@@ -0,0 +1,232 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session # type: ignore
+
+from app.models import db_model
+from app.models.NDVI_model import NDVIRequest, NDVIResponse
+from app.services import NDVI_store
+
+logger = logging.getLogger(__name__)
+
+
+def find_snapshot(db: Session, field_id: int, start_date: str, end_date: str) -> Optional[db_model.NDVISnapshot]:
+    """Precomputed result for exactly this field and window, if the scheduler has one."""
+    return db.query(db_model.NDVISnapshot).filter(
+        db_model.NDVISnapshot.field_id == field_id,
+        db_model.NDVISnapshot.start_date == start_date,
+        db_model.NDVISnapshot.end_date == end_date
+    ).first()
+
+
+def snapshot_response(snapshot: db_model.NDVISnapshot) -> NDVIResponse:
+    response = NDVIResponse.model_validate_json(snapshot.analysis)
+    response.date = snapshot.end_date
+    return response
+
+
+class NDVIPrecomputeScheduler:
+    """
+    Keeps NDVI stats + heatmaps for every field ready for the dashboard window.
+
+    Every `interval_minutes` the fields table is walked and the fields are
+    grouped like calculate_ndvi_for_fields does (NDVIService.field_groups):
+    overlapping, nested and nearby fields share one covering raster fetch,
+    and each field's stats and heatmap are cut out of it.
+    For each group the catalog's newest Sentinel-2 acquisition in the window
+    is looked up; a field is only recomputed when its own snapshot has a
+    different acquisition (or there's none yet), otherwise its stored result
+    is moved to today's window. Without the scene catalog every run
+    recomputes. Every field's observation store is synced on the way for
+    /history. Groups are processed `concurrency` at a time and retried with
+    exponential backoff. Requests whose field and window match a snapshot
+    are served from the database (see find_snapshot).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], get_service: Callable, interval_minutes: float,
+                 window_days: int, concurrency: int = 2, retries: int = 3, backoff_s: float = 5.0):
+        self._session_factory = session_factory
+        self._get_service = get_service
+        self.interval_s = max(1.0, interval_minutes * 60)
+        self.window_days = window_days
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.backoff_s = backoff_s
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._queue_depth = 0
+        self._in_progress = 0
+        self._running = False
+        self._last_run_started: Optional[datetime] = None
+        self._last_run_finished: Optional[datetime] = None
+        self._last_run: Optional[Dict] = None
+        self._next_run: Optional[datetime] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ndvi-precompute", daemon=True)
+        self._thread.start()
+        logger.info(f"NDVI precompute scheduler started (every {self.interval_s / 60:.0f} min)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"NDVI precompute run failed: {e}")
+            self._next_run = datetime.utcnow() + timedelta(seconds=self.interval_s)
+            if self._stop.wait(self.interval_s):
+                break
+
+    def run_once(self) -> Dict:
+        """One pass over all fields. Returns the run summary (also kept for status())."""
+        with self._run_lock:
+            today = date.today()
+            window = ((today - timedelta(days=self.window_days)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"))
+
+            db = self._session_factory()
+            try:
+                fields = db.query(db_model.Field).all()
+                groups = [group["field_ids"] for group in self._get_service().field_groups(fields)]
+            finally:
+                db.close()
+
+            summary = {"fields": len(fields), "groups": len(groups), "computed": 0, "reused": 0,
+                       "fresh": 0, "failed": 0}
+            with self._lock:
+                self._running = True
+                self._queue_depth = len(groups)
+                self._last_run_started = datetime.utcnow()
+
+            started = time.perf_counter()
+            try:
+                with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ndvi-precompute") as pool:
+                    futures = {pool.submit(self._refresh_with_retry, ids, window): ids for ids in groups}
+                    for future in as_completed(futures):
+                        summary[future.result()] += 1
+            finally:
+                with self._lock:
+                    self._running = False
+                    self._queue_depth = 0
+                    self._last_run_finished = datetime.utcnow()
+                    summary["seconds"] = round(time.perf_counter() - started, 1)
+                    self._last_run = summary
+            logger.info(f"NDVI precompute run: {summary}")
+            return summary
+
+    def _refresh_with_retry(self, field_ids: List[int], window: Tuple[str, str]) -> str:
+        with self._lock:
+            self._queue_depth -= 1
+            self._in_progress += 1
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    return self._refresh(field_ids, window)
+                except Exception as e:
+                    if attempt == self.retries:
+                        logger.error(f"Precompute for fields {field_ids} failed after {attempt + 1} attempts: {e}")
+                        return "failed"
+                    delay = self.backoff_s * (2 ** attempt) * random.uniform(1.0, 1.5)
+                    logger.warning(f"Precompute for fields {field_ids} failed ({e}), retrying in {delay:.1f}s")
+                    if self._stop.wait(delay):
+                        return "failed"
+        finally:
+            with self._lock:
+                self._in_progress -= 1
+
+    def _refresh(self, field_ids: List[int], window: Tuple[str, str]) -> str:
+        """Bring the snapshots of one group's fields up to date; returns computed/reused/fresh."""
+        start_date, end_date = window
+        db = self._session_factory()
+        try:
+            service = self._get_service()
+            fields = db.query(db_model.Field).filter(db_model.Field.id.in_(field_ids)).all()
+            if not fields:
+                return "fresh"  # deleted since the run started
+            start = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+            # new acquisitions land in each field's observation store (usually one small request)
+            for field in fields:
+                NDVI_store.sync_field(db, service, field, start, end)
+
+            # Freshness follows the catalog, not the store: the store only keeps
+            # dates with valid pixels over a field, while the mosaic changes with
+            # every new (even partly cloudy) acquisition. None = no catalog/no scene.
+            latest_date = service.latest_acquisition_date(NDVIRequest(
+                north=max(f.north for f in fields),
+                south=min(f.south for f in fields),
+                east=max(f.east for f in fields),
+                west=min(f.west for f in fields),
+                start_date=start_date,
+                end_date=end_date
+            ))
+            latest = datetime.strptime(latest_date, "%Y-%m-%d").date() if latest_date else None
+
+            snapshots = {
+                s.field_id: s for s in db.query(db_model.NDVISnapshot).filter(
+                    db_model.NDVISnapshot.field_id.in_(field_ids)
+                )
+            }
+            # every field is judged by its own snapshot
+            stale = [
+                field for field in fields
+                if latest is None or field.id not in snapshots or snapshots[field.id].acquisition_date != latest
+            ]
+            if not stale and all(s.start_date == start_date and s.end_date == end_date for s in snapshots.values()):
+                return "fresh"
+
+            results = {}
+            if stale:
+                service.rate_limiter.acquire()
+                results = service.analyze_fields_with_heatmaps(stale, start_date, end_date)
+
+            # unchanged fields keep their result (same latest scene); it just moves to today's window
+            for field in fields:
+                snapshot = snapshots.get(field.id)
+                if snapshot is None:
+                    snapshot = db_model.NDVISnapshot(field_id=field.id)
+                    db.add(snapshot)
+                snapshot.start_date, snapshot.end_date = start_date, end_date
+                snapshot.acquisition_date = latest
+                if field.id in results:
+                    response, snapshot.heatmap_png = results[field.id]
+                    snapshot.analysis = response.model_dump_json()
+            db.commit()
+            return "computed" if stale else "reused"
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self._thread is not None,
+                "running": self._running,
+                "queue_depth": self._queue_depth,
+                "in_progress": self._in_progress,
+                "interval_minutes": round(self.interval_s / 60, 1),
+                "window_days": self.window_days,
+                "last_run_started": self._last_run_started.isoformat() if self._last_run_started else None,
+                "last_run_finished": self._last_run_finished.isoformat() if self._last_run_finished else None,
+                "last_run": self._last_run,
+                "next_run": self._next_run.isoformat() if self._next_run else None,
+            }
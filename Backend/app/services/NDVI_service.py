@@ -1,16 +1,156 @@
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from app.models.NDVI_model import NDVIRequest, NDVIResponse, NDVIData
-from sentinelhub import SHConfig, SentinelHubRequest, DataCollection, MimeType, bbox_to_dimensions, BBox,CRS  # type: ignore
-from fastapi import Response # type: ignore
+from sentinelhub import SHConfig, SentinelHubRequest, DataCollection, MimeType, BBox,CRS  # type: ignore
 from PIL import Image # type: ignore
 import io,os
+import threading
+import json
 from app.core.config import settings
+from app.core.rate_limit import RateLimiter
+from app.core.raster_cache import RasterCache, DEFAULT_CACHE_DIR
+from app.core.single_flight import SingleFlight
+from app.services.NDVI_stats import ndvi_stats, NDVIStatsAccumulator
+from app.services.NDVI_tiling import split_bbox
+from app.services.NDVI_geometry import output_dimensions
+from app.services.NDVI_coalesce import plan_field_groups, field_window
+from app.services.NDVI_masks import MaskCache
+from app.services.NDVI_catalog import SceneCatalog
+from app.services.NDVI_tiles import TilePyramid, tile_bounds
+from app.services.NDVI_geotiff import GeoTIFFExportCache, write_cog
+from app.services.fields_service import field_geometry
+from app.services.NDVI_store import is_final_window
 import logging 
 
 logger = logging.getLogger(__name__)
 
+NDVI_EVALSCRIPT = """
+//VERSION=3
+function setup() {
+    return {
+        input: ["B04", "B08", "SCL"],
+        output: { bands: 1, sampleType: "FLOAT32" }
+    };
+}
+function evaluatePixel(sample) {
+    if ([3, 8, 9, 10, 11].includes(sample.SCL)) return [NaN];
+    let ndvi = (sample.B08 - sample.B04) / (sample.B08 + sample.B04);
+    return [ndvi];
+}
+"""
+
+# True color (RGB)
+TRUE_COLOR_EVALSCRIPT = """
+//VERSION=3
+function setup() {
+return {
+    input: ["B04", "B03", "B02"],
+    output: { bands: 3, sampleType: "UINT8" }
+};
+}
+function evaluatePixel(sample) {
+return [sample.B04 * 255, sample.B03 * 255, sample.B02 * 255];
+}
+"""
+
+# NDVI heatmap palette (same 9 classes the old heatmap evalscript used).
+# Class k covers HEATMAP_THRESHOLDS[k-1] <= ndvi < HEATMAP_THRESHOLDS[k].
+HEATMAP_THRESHOLDS = np.array([0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7], dtype=np.float32)
+HEATMAP_PALETTE = np.array([
+    [165, 0, 38],
+    [215, 48, 39],
+    [244, 109, 67],
+    [253, 174, 97],
+    [254, 224, 144],
+    [173, 221, 142],
+    [120, 198, 121],
+    [49, 163, 84],
+    [0, 104, 55],
+    [0, 0, 0],  # clouds / no data
+], dtype=np.uint8)
+NO_DATA_CLASS = len(HEATMAP_PALETTE) - 1
+
+
+def colorize_ndvi(ndvi_array: np.ndarray) -> np.ndarray:
+    """Map a float NDVI raster (NaN = cloud/no data) to an (H, W, 3) uint8 heatmap."""
+    classes = np.searchsorted(HEATMAP_THRESHOLDS, ndvi_array, side="right").astype(np.uint8)
+    classes[np.isnan(ndvi_array)] = NO_DATA_CLASS
+    return HEATMAP_PALETTE[classes]
+
+
+def encode_png(img_array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(img_array).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_map_tile(ndvi_array: np.ndarray) -> bytes:
+    """Heatmap map tile: same palette, but clouds / no data are transparent so the base map shows through."""
+    rgba = np.empty(ndvi_array.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = colorize_ndvi(ndvi_array)
+    rgba[..., 3] = np.where(np.isnan(ndvi_array), 0, 255)
+    return encode_png(rgba)
+
+
+# One FLOAT32 band per Sentinel-2 acquisition in the time interval (ORBIT mosaicking).
+# The acquisition dates come back in userdata.json, in the same order as the bands.
+NDVI_TIMESERIES_EVALSCRIPT = """
+//VERSION=3
+function setup() {
+    return {
+        input: [{ bands: ["B04", "B08", "SCL"] }],
+        output: { bands: 1, sampleType: "FLOAT32" },
+        mosaicking: "ORBIT"
+    };
+}
+function updateOutput(outputs, collection) {
+    // at least one band, otherwise the request fails on empty intervals
+    Object.values(outputs).forEach((output) => {
+        output.bands = Math.max(1, collection.scenes.length);
+    });
+}
+function updateOutputMetadata(scenes, inputMetadata, outputMetadata) {
+    outputMetadata.userData = { dates: scenes.orbits.map((orbit) => orbit.dateFrom) };
+}
+function evaluatePixel(samples) {
+    if (samples.length === 0) return [NaN];
+    return samples.map((sample) => {
+        if ([3, 8, 9, 10, 11].includes(sample.SCL)) return NaN;
+        return (sample.B08 - sample.B04) / (sample.B08 + sample.B04);
+    });
+}
+"""
+
+
+def ndvi_cube_stats(cube: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-date NDVI statistics for a (T, H, W) cube in one vectorized pass.
+
+    Returns arrays of length T: median, mean, min, max (NaN where a date has
+    no valid pixels) and valid_pixels.
+    """
+    flat = cube.reshape(cube.shape[0], -1)
+    valid = np.count_nonzero(~np.isnan(flat), axis=1)
+    stats = {
+        "median": np.full(flat.shape[0], np.nan),
+        "mean": np.full(flat.shape[0], np.nan),
+        "min": np.full(flat.shape[0], np.nan),
+        "max": np.full(flat.shape[0], np.nan),
+        "valid_pixels": valid,
+    }
+    has_data = valid > 0
+    if has_data.any():
+        # only reduce over dates with data, so numpy doesn't warn on all-NaN slices
+        rows = flat[has_data]
+        stats["median"][has_data] = np.nanmedian(rows, axis=1)
+        stats["mean"][has_data] = np.nanmean(rows, axis=1)
+        stats["min"][has_data] = np.nanmin(rows, axis=1)
+        stats["max"][has_data] = np.nanmax(rows, axis=1)
+    return stats
+
+
 class NDVIService:
     """Service for NDVI calculations and analysis"""
 
@@ -21,150 +161,77 @@ class NDVIService:
         self.config.sh_client_secret = settings.SH_CLIENT_SECRET
         # Optionally: self.config.sh_base_url = 'https://services.sentinel-hub.com'
 
-    def calculate_ndvi(self, request: NDVIRequest) -> NDVIResponse:
-        """
-        Calculate NDVI using Sentinel Hub data for point or bbox.
+        # Shared across all fan-out calls so we stay inside the Sentinel Hub quota
+        self.max_concurrency = max(1, settings.sh_max_concurrency)
+        self.rate_limiter = RateLimiter(settings.sh_requests_per_second, burst=self.max_concurrency)
 
-        Returns:
-            NDVIResponse with NDVI stats, bbox info, etc.
-        """
-        try:
-            # Decide mode
-            if request.north and request.south and request.east and request.west:
-                mode = "bbox"
-                bbox = BBox([request.west, request.south, request.east, request.north], crs=CRS.WGS84)
-                logger.debug(f"Using bbox mode with bbox={bbox}")
-            else:
-                mode = "point"
-                delta = 0.01  # ~2km area
-                bbox = BBox([request.longitude - delta, request.latitude - delta,
-                            request.longitude + delta, request.latitude + delta], crs=CRS.WGS84)
-                logger.debug(f"Using point mode (expanded) with bbox={bbox}")
-
-            resolution = 10  # 10 meters
-            width = int((bbox.max_x - bbox.min_x) * (111320 / resolution))  # 1 degree ≈ ~111.32 km
-            height = int((bbox.max_y - bbox.min_y) * (111320 / resolution))
-            size = (width, height)
-            logger.debug(f"Calculated size: {size} for bbox {bbox}")
-            # Sentinel request
-            evalscript = """
-            //VERSION=3
-            function setup() {
-                return {
-                    input: ["B04", "B08", "SCL"],
-                    output: { bands: 1, sampleType: "FLOAT32" }
-                };
-            }
-            function evaluatePixel(sample) {
-                if ([3, 8, 9, 10, 11].includes(sample.SCL)) return [NaN];
-                let ndvi = (sample.B08 - sample.B04) / (sample.B08 + sample.B04);
-                return [ndvi];
-            }
-            """
-
-            request_payload = SentinelHubRequest(
-                evalscript=evalscript,
-                input_data=[
-                    SentinelHubRequest.input_data(
-                        data_collection=DataCollection.SENTINEL2_L2A,
-                        time_interval=(request.start_date, request.end_date)
-                    )
-                ],
-                responses=[SentinelHubRequest.output_response("default", MimeType.TIFF)],
-                bbox=bbox,
-                size=size,
-                config=self.config
-            )
+        self.raster_cache = RasterCache(
+            settings.raster_cache_dir or DEFAULT_CACHE_DIR,
+            max_bytes=settings.raster_cache_max_mb * 1024 * 1024
+        )
 
-            ndvi_data = request_payload.get_data()
-            logger.debug(f"Received data type: {type(ndvi_data)}, length: {len(ndvi_data)}")
-            ndvi_array = ndvi_data[0].squeeze()
-            logger.debug(f"NDVI array shape: {ndvi_array.shape}")
+        # Identical requests in flight at the same time share one upstream call
+        self.single_flight = SingleFlight()
+        # Process API requests actually sent (not served by a cache or a shared call)
+        self.pixel_requests = 0
+        self._stats_lock = threading.Lock()
 
-            if np.isnan(ndvi_array).all():
-                logger.debug("All values are NaN → no valid pixels")
-                average_ndvi = min_ndvi = max_ndvi = None
-                valid_pixels = 0
-                health_distribution = {}
-                ndvi_value_raw = 0.0
-                vegetation_health = "Unknown"
-            else:
-                average_ndvi = float(np.nanmean(ndvi_array))
-                min_ndvi = float(np.nanmin(ndvi_array))
-                max_ndvi = float(np.nanmax(ndvi_array))
-                valid_pixels = int(np.count_nonzero(~np.isnan(ndvi_array)))
-                health_distribution = {
-                    "Poor": int(np.sum(ndvi_array < 0.2)),
-                    "Fair": int(np.sum((ndvi_array >= 0.2) & (ndvi_array < 0.4))),
-                    "Good": int(np.sum((ndvi_array >= 0.4) & (ndvi_array < 0.6))),
-                    "Excellent": int(np.sum(ndvi_array >= 0.6))
-                }
-                ndvi_value_raw = float(np.nanmedian(ndvi_array))
-                vegetation_health = self.get_vegetation_health(ndvi_value_raw)
-
-                logger.debug(f"Computed stats: avg={average_ndvi}, min={min_ndvi}, max={max_ndvi}, valid_pixels={valid_pixels}")
-
-            return NDVIResponse(
-                latitude=request.latitude,
-                longitude=request.longitude,
-                ndvi_value=round(ndvi_value_raw, 3) if ndvi_value_raw else 0.0,
-                date=request.end_date,
-                vegetation_health=vegetation_health,
-                average_ndvi=round(average_ndvi, 3) if average_ndvi is not None else None,
-                min_ndvi=round(min_ndvi, 3) if min_ndvi is not None else None,
-                max_ndvi=round(max_ndvi, 3) if max_ndvi is not None else None,
-                valid_pixel_count=valid_pixels,
-                health_distribution=health_distribution,
-                bbox=[bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y],
-                mode=mode,
-                message="NDVI analysis complete"
-            )
+        # Rasterized field polygons, reused across analyses on the same grid
+        self.mask_cache = MaskCache(settings.ndvi_mask_cache_entries)
 
-        except Exception as e:
-            logger.error(f"ERROR in calculate_ndvi: {e}")
-            raise
+        # Catalog lookup before NDVI downloads: skip windows without a usable scene
+        self.catalog = SceneCatalog(self.config, settings.ndvi_max_scene_cloud_cover) if settings.ndvi_catalog_enabled else None
 
-    def get_true_color_image(self, request: NDVIRequest) -> Response:
+        # Finished GeoTIFF exports, so range requests don't rebuild the file
+        self.geotiff_exports = GeoTIFFExportCache(
+            os.path.join(settings.raster_cache_dir or DEFAULT_CACHE_DIR, "exports"),
+            max_bytes=settings.ndvi_export_cache_mb * 1024 * 1024
+        )
+
+        # XYZ heatmap tiles for the map, rendered from cached metatiles
+        self.tile_pyramid = TilePyramid(
+            self._fetch_map_tile, render_map_tile,
+            meta_zoom=settings.ndvi_map_tile_meta_zoom,
+            metatile_px=settings.ndvi_map_tile_metatile_px,
+            min_zoom=settings.ndvi_map_tile_min_zoom,
+            max_zoom=settings.ndvi_map_tile_max_zoom,
+            max_bytes=settings.ndvi_map_tile_cache_mb * 1024 * 1024
+        )
+
+    def _fetch_raster(self, evalscript: str, request: NDVIRequest, bbox: BBox, size, mime_type: MimeType) -> np.ndarray:
         """
-        Fetch true color satellite image from Sentinel Hub as PNG.
+        Download a single-response raster for the request's time interval.
+
+        Final windows (see NDVI_store.is_final_window) are read through the
+        raster cache, since their Sentinel-2 L2A data doesn't change. Recent
+        windows can still get new acquisitions, so they always go upstream.
+        Either way, concurrent identical requests share one fetch (single
+        flight); pixel_requests counts the fetches that really went upstream.
         """
-        # Determine bbox
-        if all(v is not None for v in [request.north, request.south, request.east, request.west]):
-            if request.north <= request.south:
-                    raise ValueError("North must be greater than south")
-            if request.east <= request.west:
-                    raise ValueError("East must be greater than west")
-            bbox = BBox([request.west, request.south, request.east, request.north], crs='EPSG:4326')
-        elif request.latitude is not None and request.longitude is not None:
-            bbox = BBox([
-                request.longitude - 0.0001, request.latitude - 0.0001,
-                request.longitude + 0.0001, request.latitude + 0.0001
-            ], crs='EPSG:4326')
-        else:
-            raise ValueError("Must provide either bounding box or point coordinates")
+        def fetch() -> np.ndarray:
+            self._record_pixel_request()
+            return self._sh_request(evalscript, request, bbox, size, mime_type).get_data()[0]
 
-        size = bbox_to_dimensions(bbox, resolution=10)
+        return self._cached_fetch(evalscript, request, bbox, size, mime_type.extension, fetch)
 
-        # Evalscript for true color (RGB)
-        evalscript = """
-        //VERSION=3
-        function setup() {
-        return {
-            input: ["B04", "B03", "B02"],
-            output: { bands: 3, sampleType: "UINT8" }
-        };
-        }
-        function evaluatePixel(sample) {
-        return [sample.B04 * 255, sample.B03 * 255, sample.B02 * 255];
-        }
+    def _fetch_encoded(self, evalscript: str, request: NDVIRequest, bbox: BBox, size, mime_type: MimeType) -> np.ndarray:
+        """
+        The provider's encoded response (e.g. PNG bytes) as a uint8 array,
+        passed through without decoding. Cached like _fetch_raster.
         """
+        def fetch() -> np.ndarray:
+            self._record_pixel_request()
+            response = self._sh_request(evalscript, request, bbox, size, mime_type).get_data(decode_data=False)[0]
+            return np.frombuffer(response.content, dtype=np.uint8)
+
+        return self._cached_fetch(evalscript, request, bbox, size, f"{mime_type.extension}:encoded", fetch)
 
-        # Use clean relative folder: Backend/app/tmp/sentinel_images
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        tmp_dir = os.path.abspath(os.path.join(base_dir, '..', 'tmp', 'sentinel_images'))
-        os.makedirs(tmp_dir, exist_ok=True)
+    def _record_pixel_request(self):
+        with self._stats_lock:
+            self.pixel_requests += 1
 
-        request_img = SentinelHubRequest(
+    def _sh_request(self, evalscript: str, request: NDVIRequest, bbox: BBox, size, mime_type: MimeType) -> SentinelHubRequest:
+        return SentinelHubRequest(
             evalscript=evalscript,
             input_data=[
                 SentinelHubRequest.input_data(
@@ -172,38 +239,44 @@ class NDVIService:
                     time_interval=(request.start_date, request.end_date)
                 )
             ],
-            responses=[
-                SentinelHubRequest.output_response('default', MimeType.PNG)
-            ],
+            responses=[SentinelHubRequest.output_response("default", mime_type)],
             bbox=bbox,
             size=size,
-            config=self.config,
-            data_folder=tmp_dir
+            config=self.config
         )
 
-        # Get image data (returns np.ndarray with shape HxWx3)
-        img_array = request_img.get_data()[0]
-
-        # Convert to uint8 if needed
-        if img_array.dtype != np.uint8:
-            img_array = np.clip(img_array, 0, 255).astype(np.uint8)
-
-        # Convert to PIL Image
-        img = Image.fromarray(img_array)
-
-        # Save to in‑memory buffer
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-
-        # Return as FastAPI Response
-        return Response(content=buffer.read(), media_type="image/png")
-    
-    def get_heatmap_image(self, request: NDVIRequest) -> Response:
-        """
-        Fetch heatmap image based on NDVI values from Sentinel Hub as PNG.
-        """
-        # Determine bbox
+    def _cached_fetch(self, evalscript: str, request: NDVIRequest, bbox: BBox, size, fmt: str, fetch) -> np.ndarray:
+        key = RasterCache.make_key(
+            [bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y], (request.start_date, request.end_date), evalscript, size, fmt
+        )
+        if not is_final_window(request.end_date):
+            return self.single_flight.do(key, fetch)
+        return self.single_flight.do(key, lambda: self.raster_cache.get_or_fetch(key, fetch))
+
+    def _resolve_ndvi_bbox(self, request: NDVIRequest):
+        """Decide point/bbox mode and return (mode, bbox, size) for an NDVI request."""
+        if request.north and request.south and request.east and request.west:
+            mode = "bbox"
+            bbox = BBox([request.west, request.south, request.east, request.north], crs=CRS.WGS84)
+            logger.debug(f"Using bbox mode with bbox={bbox}")
+        else:
+            mode = "point"
+            delta = 0.01  # ~2km area
+            bbox = BBox([request.longitude - delta, request.latitude - delta,
+                        request.longitude + delta, request.latitude + delta], crs=CRS.WGS84)
+            logger.debug(f"Using point mode (expanded) with bbox={bbox}")
+
+        size = self._output_size(bbox)
+        return mode, bbox, size
+
+    def _output_size(self, bbox: BBox):
+        """Pixel size for a bbox, shared by the NDVI, heatmap and true color paths."""
+        size, resolution = output_dimensions(bbox, settings.ndvi_resolution_m, settings.ndvi_max_pixels)
+        logger.debug(f"Calculated size: {size} at {resolution:.1f} m for bbox {bbox}")
+        return size
+
+    def _resolve_image_bbox(self, request: NDVIRequest):
+        """Bbox and size for the image endpoints (tiny box around a point in point mode)."""
         if all(v is not None for v in [request.north, request.south, request.east, request.west]):
             if request.north <= request.south:
                     raise ValueError("North must be greater than south")
@@ -218,107 +291,587 @@ class NDVIService:
         else:
             raise ValueError("Must provide either bounding box or point coordinates")
 
-        size = bbox_to_dimensions(bbox, resolution=10)
+        return bbox, self._output_size(bbox)
 
-        evalscript = """
-        //VERSION=3
-        function setup() {
-            return {
-                input: ["B04", "B08", "SCL"],
-                output: { bands: 3, sampleType: "UINT8" }
-            };
-        }
-        var cloudValues = [3, 8, 9, 10, 11];
-        function evaluatePixel(sample) {
-            if (cloudValues.includes(sample.SCL)) {
-                return [0, 0, 0]; // black for clouds
-            }
-            let ndvi = (sample.B08 - sample.B04) / (sample.B08 + sample.B04);
-            if (ndvi < 0.0) return [165, 0, 38];
-            else if (ndvi < 0.1) return [215, 48, 39];
-            else if (ndvi < 0.2) return [244, 109, 67];
-            else if (ndvi < 0.3) return [253, 174, 97];
-            else if (ndvi < 0.4) return [254, 224, 144];
-            else if (ndvi < 0.5) return [173, 221, 142];    
-            else if (ndvi < 0.6) return [120, 198, 121];   
-            else if (ndvi < 0.7) return [49, 163, 84];      
-            else return [0, 104, 55];                       
+    def _field_mask(self, geometry, bbox: BBox, shape, rows: slice = slice(None), cols: slice = slice(None)):
+        """In-polygon pixels of a raster over `bbox` with `shape` (rows, cols), or None without a polygon."""
+        if not geometry or len(shape) != 2:
+            return None  # no polygon (or a squeezed 1-pixel-wide raster)
+        height, width = shape
+        return self.mask_cache.get(
+            geometry, [bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y], (width, height), rows, cols
+        )
 
-        }
+    def _masked_for_heatmap(self, request: NDVIRequest, bbox: BBox, ndvi_array: np.ndarray) -> np.ndarray:
+        """Pixels outside the field polygon become no-data (NaN)."""
+        mask = self._field_mask(request.geometry, bbox, ndvi_array.shape)
+        return ndvi_array if mask is None else np.where(mask, ndvi_array, np.float32(np.nan))
+
+    def _lookup_acquisitions(self, bbox: BBox, start_date: str, end_date: str) -> Optional[List[Dict]]:
+        """Catalog acquisitions for the window, or None if the catalog is off or unreachable."""
+        if self.catalog is None:
+            return None
+        key = "catalog:" + RasterCache.make_key(
+            [bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y], (start_date, end_date), "", (0, 0), "catalog"
+        )
+        try:
+            return self.single_flight.do(key, lambda: self.catalog.acquisitions(bbox, start_date, end_date))
+        except Exception as e:
+            logger.warning(f"Catalog lookup failed, downloading without it: {e}")
+            return None
+
+    def _scene_request(self, request: NDVIRequest, bbox: BBox, acquisitions: Optional[List[Dict]] = None,
+                       downloads: int = 1) -> Optional[NDVIRequest]:
         """
+        The request narrowed to the span from its oldest to its newest usable
+        scene (same mosaic, minus the too-cloudy scenes at either end), or
+        None when the window has none (no acquisition, or all too cloudy), so
+        the pixel download can be skipped. Without catalog data the request
+        is returned unchanged. `downloads` is what the request would cost
+        (tiles), for the avoided-downloads counters.
+        """
+        if acquisitions is None:
+            acquisitions = self._lookup_acquisitions(bbox, request.start_date, request.end_date)
+        if acquisitions is None:
+            return request
+        usable_range = self.catalog.usable_range(acquisitions)
+        if usable_range is None:
+            self.catalog.record(avoided=downloads)
+            logger.debug(f"No usable scene in {request.start_date}..{request.end_date}, skipping download")
+            return None
+        self.catalog.record(downloaded=downloads)
+        start_date, end_date = usable_range
+        return request.model_copy(update={"start_date": start_date, "end_date": end_date})
+
+    def _fetch_ndvi_raster(self, request: NDVIRequest, bbox: BBox, size, select_scene: bool = True) -> np.ndarray:
+        """NDVI raster (NaN = cloud / no data) for the request; all NaN, without a download, if no usable scene."""
+        scene_request = self._scene_request(request, bbox) if select_scene else request
+        if scene_request is None:
+            return np.full((size[1], size[0]), np.nan, dtype=np.float32)
+        # Sentinel request (served from the raster cache when possible)
+        return self._fetch_raster(NDVI_EVALSCRIPT, scene_request, bbox, size, MimeType.TIFF).squeeze()
+
+    def calculate_ndvi(self, request: NDVIRequest, select_scene: bool = True) -> NDVIResponse:
+        """
+        Calculate NDVI using Sentinel Hub data for point or bbox.
 
-        request_img = SentinelHubRequest(
-            evalscript=evalscript,
-            input_data=[SentinelHubRequest.input_data(
-                data_collection=DataCollection.SENTINEL2_L2A,
-                time_interval=(request.start_date, request.end_date)
-            )],
-            responses=[SentinelHubRequest.output_response('default', MimeType.PNG)],
-            bbox=bbox,
-            size=size,
-            config=self.config
+        The window is narrowed to its usable scenes from the catalog first (see
+        _scene_request); pass select_scene=False if that was already done.
+
+        Returns:
+            NDVIResponse with NDVI stats, bbox info, etc.
+        """
+        try:
+            mode, bbox, size = self._resolve_ndvi_bbox(request)
+            if max(size) > settings.ndvi_tile_size_px:
+                # too big for one request / one in-memory array
+                return self.calculate_ndvi_tiled(request, select_scene)
+
+            ndvi_array = self._fetch_ndvi_raster(request, bbox, size, select_scene)
+            logger.debug(f"NDVI array shape: {ndvi_array.shape}")
+            return self._build_ndvi_response(request, mode, bbox, ndvi_array)
+
+        except Exception as e:
+            logger.error(f"ERROR in calculate_ndvi: {e}")
+            raise
+
+    def region_tile_count(self, request: NDVIRequest) -> int:
+        """How many tiles calculate_ndvi_tiled would download for this request (no network)."""
+        _, bbox, size = self._resolve_ndvi_bbox(request)
+        return len(split_bbox(bbox, size, settings.ndvi_tile_size_px))
+
+    def calculate_ndvi_tiled(self, request: NDVIRequest, select_scene: bool = True) -> NDVIResponse:
+        """
+        NDVI stats for a large bbox (e.g. a district), fetched tile by tile.
+
+        The bbox is split into Sentinel Hub-legal tiles of ndvi_tile_size_px,
+        up to ndvi_tile_parallelism tiles are downloaded at once, and each tile
+        is folded into a mergeable accumulator and dropped, so memory stays
+        bounded by the tiles in flight rather than the area. The median is
+        estimated from the accumulator histogram (to within 0.001 NDVI).
+        """
+        mode, bbox, size = self._resolve_ndvi_bbox(request)
+        tiles = split_bbox(bbox, size, settings.ndvi_tile_size_px)
+        logger.debug(f"Tiled NDVI: {len(tiles)} tiles for size {size}")
+
+        # one catalog lookup for the whole area; every tile then uses the same scene
+        scene_request = self._scene_request(request, bbox, downloads=len(tiles)) if select_scene else request
+        if scene_request is None:
+            response = self._response_from_stats(request, mode, bbox, NDVIStatsAccumulator().result())
+            response.message = "No usable Sentinel-2 scene in the time window"
+            return response
+
+        def process_tile(tile):
+            tile_bbox, tile_size = tile
+            self.rate_limiter.acquire()
+            tile_array = self._fetch_raster(NDVI_EVALSCRIPT, scene_request, tile_bbox, tile_size, MimeType.TIFF).squeeze()
+            mask = self._field_mask(request.geometry, tile_bbox, tile_array.shape)
+            return NDVIStatsAccumulator().add(tile_array if mask is None else tile_array[mask])
+
+        accumulator = NDVIStatsAccumulator()
+        workers = max(1, min(settings.ndvi_tile_parallelism, len(tiles)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ndvi-tile") as pool:
+            for future in as_completed([pool.submit(process_tile, tile) for tile in tiles]):
+                accumulator.merge(future.result())
+
+        response = self._response_from_stats(request, mode, bbox, accumulator.result())
+        response.message = f"NDVI analysis complete ({len(tiles)} tiles)"
+        return response
+
+    def analyze_with_heatmap(self, request: NDVIRequest) -> Tuple[NDVIResponse, bytes]:
+        """
+        NDVI stats and heatmap PNG for the same request from one raster fetch.
+        """
+        try:
+            mode, bbox, ndvi_array = self._fetch_ndvi_array(request)
+            response = self._build_ndvi_response(request, mode, bbox, ndvi_array)
+            return response, encode_png(colorize_ndvi(self._masked_for_heatmap(request, bbox, ndvi_array)))
+
+        except Exception as e:
+            logger.error(f"ERROR in analyze_with_heatmap: {e}")
+            raise
+
+    def _fetch_ndvi_array(self, request: NDVIRequest):
+        """Return (mode, bbox, ndvi_array) with NaN for cloud/no-data pixels."""
+        mode, bbox, size = self._resolve_ndvi_bbox(request)
+        ndvi_array = self._fetch_ndvi_raster(request, bbox, size)
+        logger.debug(f"NDVI array shape: {ndvi_array.shape}")
+        return mode, bbox, ndvi_array
+
+    def _build_ndvi_response(self, request: NDVIRequest, mode: str, bbox: BBox, ndvi_array: np.ndarray) -> NDVIResponse:
+        # only pixels inside the field polygon, if there is one
+        mask = self._field_mask(request.geometry, bbox, ndvi_array.shape)
+        stats = ndvi_stats(ndvi_array if mask is None else ndvi_array[mask])  # single pass, see NDVI_stats
+        return self._response_from_stats(request, mode, bbox, stats)
+
+    def _response_from_stats(self, request: NDVIRequest, mode: str, bbox: BBox, stats: Dict) -> NDVIResponse:
+        valid_pixels = stats["valid_pixels"]
+        health_distribution = stats["health_distribution"]
+        average_ndvi, min_ndvi, max_ndvi = stats["mean"], stats["min"], stats["max"]
+
+        if valid_pixels == 0:
+            logger.debug("All values are NaN → no valid pixels")
+            ndvi_value_raw = 0.0
+            vegetation_health = "Unknown"
+        else:
+            ndvi_value_raw = stats["median"]
+            vegetation_health = self.get_vegetation_health(ndvi_value_raw)
+
+            logger.debug(f"Computed stats: avg={average_ndvi}, min={min_ndvi}, max={max_ndvi}, valid_pixels={valid_pixels}")
+
+        return NDVIResponse(
+            latitude=request.latitude,
+            longitude=request.longitude,
+            ndvi_value=round(ndvi_value_raw, 3) if ndvi_value_raw else 0.0,
+            date=request.end_date,
+            vegetation_health=vegetation_health,
+            average_ndvi=round(average_ndvi, 3) if average_ndvi is not None else None,
+            min_ndvi=round(min_ndvi, 3) if min_ndvi is not None else None,
+            max_ndvi=round(max_ndvi, 3) if max_ndvi is not None else None,
+            valid_pixel_count=valid_pixels,
+            health_distribution=health_distribution,
+            bbox=[bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y],
+            mode=mode,
+            message="NDVI analysis complete"
         )
 
-        ndvi_array = request_img.get_data()[0]  # NumPy array, shape (H,W,3), dtype=uint8
+    def calculate_ndvi_for_fields(self, fields: List, start_date: str, end_date: str) -> Tuple[Dict[int, NDVIResponse], List[Dict], List[Dict]]:
+        """
+        NDVI stats for many fields, with nearby fields sharing one fetch.
+
+        Fields are grouped by plan_field_groups (see NDVI_coalesce); each
+        group's covering raster is fetched once and every field's stats are
+        cut out of it locally (only the pixels inside the field polygon when
+        the field has one). Single-field groups go through calculate_ndvi
+        unchanged. Groups run concurrently, bounded like get_ndvi_history.
+        Stats of grouped fields come from the group's pixel grid, so they can
+        differ slightly from a per-field request at the field edges.
+
+        :param fields: objects with id, north, south, east, west (e.g. db_model.Field)
+        :return: (results by field id, failures [{"field_ids", "error"}], groups)
+        """
+        by_id = {field.id: field for field in fields}
+        groups = self.field_groups(fields)
+        logger.debug(f"{len(fields)} fields planned into {len(groups)} requests")
+
+        def field_request(field) -> NDVIRequest:
+            return NDVIRequest(north=field.north, south=field.south, east=field.east, west=field.west,
+                               start_date=start_date, end_date=end_date, geometry=field_geometry(field))
+
+        def process_group(group) -> Dict[int, NDVIResponse]:
+            self.rate_limiter.acquire()
+            if len(group["field_ids"]) == 1:
+                field = by_id[group["field_ids"][0]]
+                return {field.id: self.calculate_ndvi(field_request(field))}
+
+            west, south, east, north = group["bbox"]
+            group_request = NDVIRequest(north=north, south=south, east=east, west=west,
+                                        start_date=start_date, end_date=end_date)
+            _, bbox, size = self._resolve_ndvi_bbox(group_request)
+            ndvi_array = self._fetch_ndvi_raster(group_request, bbox, size)
+
+            results = {}
+            for field_id in group["field_ids"]:
+                field = by_id[field_id]
+                window, mask = self._field_pixels(field, bbox, size, ndvi_array)
+                results[field_id] = self._response_from_stats(
+                    field_request(field), "bbox", BBox([field.west, field.south, field.east, field.north], crs=CRS.WGS84),
+                    ndvi_stats(window if mask is None else window[mask])
+                )
+            return results
+
+        results: Dict[int, NDVIResponse] = {}
+        failures = []
+        workers = max(1, min(self.max_concurrency, len(groups)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ndvi-fields") as pool:
+            futures = {pool.submit(process_group, group): group for group in groups}
+            for future in as_completed(futures):
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    logger.warning(f"NDVI for fields {futures[future]['field_ids']} failed: {e}")
+                    failures.append({"field_ids": futures[future]["field_ids"], "error": str(e)})
+        return results, failures, groups
+
+    def field_groups(self, fields: List) -> List[Dict]:
+        """plan_field_groups with the ndvi_coalesce_* settings: fields that can share one fetch."""
+        return plan_field_groups(fields, settings.ndvi_coalesce_max_gap_m,
+                                 settings.ndvi_coalesce_max_px, settings.ndvi_resolution_m)
+
+    def _field_pixels(self, field, bbox: BBox, size, ndvi_array: np.ndarray):
+        """(window, mask) of one field in a shared raster over `bbox`; mask is None without a polygon."""
+        rows, cols = field_window(bbox, size, [field.west, field.south, field.east, field.north])
+        mask = self._field_mask(field_geometry(field), bbox, ndvi_array.shape, rows, cols)
+        return ndvi_array[rows, cols], mask
+
+    def analyze_fields_with_heatmaps(self, fields: List, start_date: str,
+                                     end_date: str) -> Dict[int, Tuple[NDVIResponse, bytes]]:
+        """
+        analyze_with_heatmap for a group of fields (see field_groups) from one
+        covering raster fetch; each field's stats and heatmap are cut out of
+        it locally, like calculate_ndvi_for_fields does for stats.
+        """
+        def field_request(field) -> NDVIRequest:
+            return NDVIRequest(north=field.north, south=field.south, east=field.east, west=field.west,
+                               start_date=start_date, end_date=end_date, geometry=field_geometry(field))
+
+        if len(fields) == 1:
+            return {fields[0].id: self.analyze_with_heatmap(field_request(fields[0]))}
+
+        group_request = NDVIRequest(
+            north=max(f.north for f in fields), south=min(f.south for f in fields),
+            east=max(f.east for f in fields), west=min(f.west for f in fields),
+            start_date=start_date, end_date=end_date
+        )
+        _, bbox, size = self._resolve_ndvi_bbox(group_request)
+        ndvi_array = self._fetch_ndvi_raster(group_request, bbox, size)
+
+        results = {}
+        for field in fields:
+            window, mask = self._field_pixels(field, bbox, size, ndvi_array)
+            response = self._response_from_stats(
+                field_request(field), "bbox", BBox([field.west, field.south, field.east, field.north], crs=CRS.WGS84),
+                ndvi_stats(window if mask is None else window[mask])
+            )
+            heatmap = window if mask is None else np.where(mask, window, np.float32(np.nan))
+            results[field.id] = (response, encode_png(colorize_ndvi(heatmap)))
+        return results
 
-        # Convert NumPy array to PNG bytes:
-        img = Image.fromarray(ndvi_array, mode='RGB')
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
+    def get_true_color_png(self, request: NDVIRequest) -> np.ndarray:
+        """
+        True color PNG exactly as Sentinel Hub encoded it (the evalscript
+        already outputs UINT8 RGB), as a uint8 array. No decode/re-encode;
+        past windows come straight from the raster cache (memory-mapped).
+        """
+        bbox, size = self._resolve_image_bbox(request)
+        return self._fetch_encoded(TRUE_COLOR_EVALSCRIPT, request, bbox, size, MimeType.PNG)
 
-        return Response(content=buffer.read(), media_type="image/png")
+    def get_heatmap_png(self, request: NDVIRequest) -> bytes:
+        """
+        Heatmap PNG based on NDVI values.
+        """
+        bbox, size = self._resolve_image_bbox(request)
 
-    def get_ndvi_history(self, lat: float, lon: float, days: int , step_days: int ) -> List[Dict]:
+        # Float NDVI raster, colorized locally with the heatmap palette
+        ndvi_array = self._fetch_ndvi_raster(request, bbox, size)
+
+        ndvi_array = self._masked_for_heatmap(request, bbox, ndvi_array)
+        return encode_png(colorize_ndvi(ndvi_array))
+
+    def _geotiff_export_key(self, request: NDVIRequest, version: str) -> Tuple[str, Optional[float]]:
+        """Export cache key and ttl: `version` (the response ETag) changes with every new scene."""
+        bbox, size = self._resolve_image_bbox(request)
+        key = RasterCache.make_key(
+            [bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y], (request.start_date, request.end_date),
+            NDVI_EVALSCRIPT, size, "cog:" + json.dumps(request.geometry, sort_keys=True) + version
+        )
+        ttl_s = None if is_final_window(request.end_date) else settings.ndvi_image_max_age_s
+        return key, ttl_s
+
+    def cached_geotiff_export(self, request: NDVIRequest, version: str) -> Optional[str]:
+        """Path of an already built export for this request and version, without building one."""
+        key, ttl_s = self._geotiff_export_key(request, version)
+        return self.geotiff_exports.get(key, ttl_s)
+
+    def export_ndvi_geotiff(self, request: NDVIRequest, version: str) -> Optional[str]:
+        """
+        The request's NDVI raster (outside the field polygon = no data) as a
+        cloud-optimized GeoTIFF file in the export cache, or None if the
+        window has no usable scene.
+
+        The file is built once per `version` (the response ETag, which for a
+        recent window includes the newest catalog acquisition), so the many
+        range requests of a GIS client all read the same file. Exports of a
+        window that isn't final yet are rebuilt after ndvi_image_max_age_s.
+        """
+        key, ttl_s = self._geotiff_export_key(request, version)
+        path = self.geotiff_exports.get(key, ttl_s)
+        if path is not None:
+            return path
+
+        bbox, size = self._resolve_image_bbox(request)
+        scene_request = self._scene_request(request, bbox)
+        if scene_request is None:
+            return None
+        bounds = [bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y]
+
+        def write(path: str):
+            ndvi_array = self._fetch_ndvi_raster(scene_request, bbox, size, select_scene=False)
+            ndvi_array = self._masked_for_heatmap(request, bbox, ndvi_array)
+            write_cog(path, ndvi_array.reshape(size[1], size[0]), bounds)
+
+        return self.single_flight.do(f"cog:{key}", lambda: self.geotiff_exports.get_or_write(key, write, ttl_s))
+
+    def get_map_tile_png(self, z: int, x: int, y: int, start_date: str, end_date: str,
+                         covered: bool = True) -> bytes:
+        """
+        NDVI heatmap PNG for an XYZ tile (Web Mercator). Windows that aren't
+        final are only kept for ndvi_image_max_age_s, since new scenes can arrive.
+        Tiles that aren't `covered` (no field of the caller in them) come back
+        transparent without a fetch.
+        """
+        if not covered:
+            return self.tile_pyramid.empty_png(z, x, y)
+        ttl_s = None if is_final_window(end_date) else settings.ndvi_image_max_age_s
+        return self.tile_pyramid.png(z, x, y, (start_date, end_date), ttl_s)
+
+    def _fetch_map_tile(self, window: Tuple[str, str], z: int, x: int, y: int, px: int) -> np.ndarray:
+        bbox = BBox(list(tile_bounds(z, x, y)), crs=CRS.POP_WEB)
+        size = (px, px)
+        request = NDVIRequest(start_date=window[0], end_date=window[1])
+        self.rate_limiter.acquire()
+        return self._fetch_ndvi_raster(request, bbox, size)
+
+    def latest_acquisition_date(self, request: NDVIRequest) -> Optional[str]:
+        """Date of the newest scene in the window per the catalog (None if there's none or no catalog)."""
+        bbox, _ = self._resolve_image_bbox(request)
+        acquisitions = self._lookup_acquisitions(bbox, request.start_date, request.end_date)
+        return acquisitions[-1]["date"] if acquisitions else None
+
+    def get_ndvi_history(self, lat: float, lon: float, days: int , step_days: int ) -> Tuple[List[Dict], List[Dict]]:
         """
         Fetch NDVI history using a small bbox around the center point to get real pixels.
 
+        One catalog lookup covers the whole range first; windows without a
+        usable scene are skipped without a pixel download. The remaining
+        per-window Sentinel Hub requests run concurrently (bounded by
+        `sh_max_concurrency` and `sh_requests_per_second`). A failing window
+        does not abort the history; it is reported in the second return value.
+
         :param lat: Latitude of center point
         :param lon: Longitude of center point
         :param days: Total number of days to look back
         :param step_days: Interval in days between measurements
-        :return: List of dicts with date, ndvi_value, average_ndvi etc.
+        :return: (history, failures) - history is a list of dicts with date, ndvi_value,
+                 average_ndvi etc. (oldest first); failures is a list of {"date", "error"}
         """
-        history = []
         today = datetime.now()
         num_points = max(1, days // step_days)
         delta = 0.005  # about ~500m around the center
 
         logger.debug(f"Requested NDVI history lat={lat}, lon={lon}, days={days}, step_days={step_days}")
 
+        requests = []
         for i in range(num_points):
             end_date = (today - timedelta(days=i * step_days)).strftime("%Y-%m-%d")
             start_date = (today - timedelta(days=(i * step_days) + 1)).strftime("%Y-%m-%d")
 
-            request = NDVIRequest(
+            requests.append(NDVIRequest(
                 north=lat + delta,
                 south=lat - delta,
                 east=lon + delta,
                 west=lon - delta,
                 start_date=start_date,
                 end_date=end_date
-            )
+            ))
+
+        # every window uses the same bbox, so one catalog query serves them all
+        _, bbox, _ = self._resolve_ndvi_bbox(requests[0])
+        acquisitions = self._lookup_acquisitions(bbox, requests[-1].start_date, requests[0].end_date)
+
+        def run_window(request: NDVIRequest):
+            if acquisitions is None:
+                return self._calculate_ndvi_window(request)
+            in_window = [a for a in acquisitions if request.start_date <= a["date"] <= request.end_date]
+            scene_request = self._scene_request(request, bbox, in_window)
+            if scene_request is None:
+                return None, None  # no usable scene, nothing downloaded
+            return self._calculate_ndvi_window(scene_request, select_scene=False)
+
+        workers = min(self.max_concurrency, len(requests))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ndvi-history") as pool:
+            # map() keeps the input order, so results line up with `requests`
+            results = list(pool.map(run_window, requests))
 
-            response = self.calculate_ndvi(request)
+        history = []
+        failures = []
+        for request, (response, error) in zip(requests, results):
+            end_date = request.end_date
+            if error is not None:
+                failures.append({"date": end_date, "error": error})
+                continue
+            if response is None:
+                logger.debug(f"Skipped date {end_date}: no usable scene in the catalog")
+                continue
 
             logger.debug(f"Date {end_date}: valid_pixel_count={response.valid_pixel_count}, ndvi_value={response.ndvi_value}")
 
             if response.valid_pixel_count and response.valid_pixel_count > 0:
-                history.append({
-                    "date": end_date,
-                    "ndvi_value": round(response.ndvi_value, 3),
-                    "average_ndvi": round(response.average_ndvi, 3) if response.average_ndvi is not None else None,
-                    "min_ndvi": round(response.min_ndvi, 3) if response.min_ndvi is not None else None,
-                    "max_ndvi": round(response.max_ndvi, 3) if response.max_ndvi is not None else None,
-                    "vegetation_health": response.vegetation_health,
-                    "valid_pixel_count": response.valid_pixel_count
-                })
+                history.append(self._history_point(end_date, response))
                 logger.debug(f"Added date {end_date} with NDVI={response.ndvi_value}")
             else:
                 logger.debug(f"Skipped date {end_date} due to missing NDVI data (valid pixels=0)")
 
         # Return oldest first
-        return list(reversed(history))
+        return list(reversed(history)), list(reversed(failures))
+
+    def _calculate_ndvi_window(self, request: NDVIRequest, select_scene: bool = True):
+        """Run one history window; returns (response, None) or (None, error message)."""
+        self.rate_limiter.acquire()
+        try:
+            return self.calculate_ndvi(request, select_scene), None
+        except Exception as e:
+            logger.warning(f"NDVI history window {request.start_date}..{request.end_date} failed: {e}")
+            return None, str(e)
+
+    @staticmethod
+    def _history_point(date: str, response: NDVIResponse) -> Dict:
+        return {
+            "date": date,
+            "ndvi_value": round(response.ndvi_value, 3),
+            "average_ndvi": round(response.average_ndvi, 3) if response.average_ndvi is not None else None,
+            "min_ndvi": round(response.min_ndvi, 3) if response.min_ndvi is not None else None,
+            "max_ndvi": round(response.max_ndvi, 3) if response.max_ndvi is not None else None,
+            "vegetation_health": response.vegetation_health,
+            "valid_pixel_count": response.valid_pixel_count
+        }
+
+    def get_ndvi_time_series(self, lat: float, lon: float, days: int, step_days: int) -> List[Dict]:
+        """
+        Fetch NDVI history with a single multi-temporal Sentinel Hub request.
+
+        Every acquisition in the last `days` days comes back as one band of a
+        (T, H, W) cube, and the per-date stats are computed in one NumPy pass.
+        Acquisitions are grouped into `step_days` buckets (counted back from
+        today, like get_ndvi_history) and the one with most valid pixels is
+        kept per bucket.
+
+        :return: List of dicts with date, ndvi_value, average_ndvi etc. (oldest first)
+        """
+        today = datetime.now()
+        observations = self.fetch_ndvi_observations(
+            lat, lon,
+            (today - timedelta(days=days)).strftime("%Y-%m-%d"),
+            today.strftime("%Y-%m-%d")
+        )
+        return self.select_per_step(observations, step_days, today)
+
+    def fetch_ndvi_observations(self, lat: float, lon: float, start_date: str, end_date: str) -> List[Dict]:
+        """
+        Every acquisition with valid pixels between start_date and end_date
+        (inclusive), from one multi-temporal request. One dict per date, same
+        keys as the history points, oldest first.
+        """
+        delta = 0.005  # same ~500m box as get_ndvi_history
+        request = NDVIRequest(
+            north=lat + delta,
+            south=lat - delta,
+            east=lon + delta,
+            west=lon - delta,
+            start_date=start_date,
+            end_date=end_date
+        )
+        _, bbox, size = self._resolve_ndvi_bbox(request)
+
+        request_payload = SentinelHubRequest(
+            evalscript=NDVI_TIMESERIES_EVALSCRIPT,
+            input_data=[
+                SentinelHubRequest.input_data(
+                    data_collection=DataCollection.SENTINEL2_L2A,
+                    time_interval=(request.start_date, request.end_date)
+                )
+            ],
+            responses=[
+                SentinelHubRequest.output_response("default", MimeType.TIFF),
+                SentinelHubRequest.output_response("userdata", MimeType.JSON)
+            ],
+            bbox=bbox,
+            size=size,
+            config=self.config
+        )
+
+        def fetch():
+            self.rate_limiter.acquire()
+            self._record_pixel_request()
+            return request_payload.get_data()[0]
+
+        key = RasterCache.make_key(
+            [bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y], (request.start_date, request.end_date),
+            NDVI_TIMESERIES_EVALSCRIPT, size, "tiff+json"
+        )
+        data = self.single_flight.do(key, fetch)
+        dates = [d[:10] for d in data["userdata.json"].get("dates", [])]
+        cube = np.asarray(data["default.tif"], dtype=np.float32)
+        # (H, W) for a single band, (H, W, T) otherwise
+        cube = cube[np.newaxis] if cube.ndim == 2 else np.moveaxis(cube, -1, 0)
+        cube = cube[:len(dates)]
+        logger.debug(f"Time series cube shape {cube.shape} for {len(dates)} acquisitions")
+
+        if not dates:
+            return []
+
+        stats = ndvi_cube_stats(cube)
+
+        by_date = {}
+        for t, date in enumerate(dates):
+            valid = int(stats["valid_pixels"][t])
+            if valid == 0:
+                logger.debug(f"Skipped date {date} due to missing NDVI data (valid pixels=0)")
+                continue
+            if date in by_date and by_date[date]["valid_pixel_count"] >= valid:
+                continue  # two orbits on the same day: keep the clearer one
+            median = float(stats["median"][t])
+            by_date[date] = {
+                "date": date,
+                "ndvi_value": round(median, 3),
+                "average_ndvi": round(float(stats["mean"][t]), 3),
+                "min_ndvi": round(float(stats["min"][t]), 3),
+                "max_ndvi": round(float(stats["max"][t]), 3),
+                "vegetation_health": self.get_vegetation_health(median),
+                "valid_pixel_count": valid
+            }
+        return [by_date[date] for date in sorted(by_date)]
+
+    @staticmethod
+    def select_per_step(observations: List[Dict], step_days: int, today: datetime = None) -> List[Dict]:
+        """Keep the observation with most valid pixels per `step_days` bucket (counted back from today)."""
+        today = today or datetime.now()
+        best = {}
+        for observation in observations:
+            bucket = (today - datetime.strptime(observation["date"], "%Y-%m-%d")).days // step_days
+            if bucket not in best or observation["valid_pixel_count"] > best[bucket]["valid_pixel_count"]:
+                best[bucket] = observation
+        return sorted(best.values(), key=lambda o: o["date"])
 
     def analyze_trend(self, ndvi_history: list) -> dict:
         """
@@ -0,0 +1,165 @@
+import numpy as np
+from typing import Dict
+
+# Vegetation health classes used by health_distribution (same thresholds as
+# NDVIService.get_vegetation_health): Poor < 0.2 <= Fair < 0.4 <= Good < 0.6 <= Excellent
+HEALTH_THRESHOLDS = np.array([0.2, 0.4, 0.6], dtype=np.float32)
+HEALTH_LABELS = ["Poor", "Fair", "Good", "Excellent"]
+
+# Elements per chunk: boolean/index temporaries never exceed one chunk
+CHUNK_SIZE = 1 << 20
+
+
+def ndvi_stats(ndvi_array: np.ndarray, chunk_size: int = CHUNK_SIZE) -> Dict:
+    """
+    All NDVI statistics for a raster (NaN = cloud / no data) in one streaming pass.
+
+    The raster is walked in chunks; each chunk's valid pixels are compacted
+    once into a float32 buffer and every reduction (count, sum, min, max,
+    health class counts) runs on that compacted chunk. The median is then
+    picked from the buffer with np.partition (linear-time selection)
+    instead of the full sort nanmedian does.
+
+    Returns a dict with valid_pixels, mean, min, max, median (None when there
+    are no valid pixels) and health_distribution ({} when there are none).
+    Values match np.nanmean/nanmin/nanmax/nanmedian on the same array
+    (the sum is accumulated in float64, so the mean can differ in the last
+    float32 digit).
+    """
+    flat = np.asarray(ndvi_array, dtype=np.float32).reshape(-1)
+
+    # np.empty only commits the pages we actually write to
+    valid_values = np.empty(flat.size, dtype=np.float32)
+    count = 0
+    total = 0.0
+    low = np.float32(np.inf)
+    high = np.float32(-np.inf)
+    below = np.zeros(len(HEALTH_THRESHOLDS), dtype=np.int64)  # pixels below each threshold
+
+    for start in range(0, flat.size, chunk_size):
+        chunk = flat[start:start + chunk_size]
+        values = chunk[~np.isnan(chunk)]
+        if values.size == 0:
+            continue
+        valid_values[count:count + values.size] = values
+        count += values.size
+        total += float(np.add.reduce(values, dtype=np.float64))
+        low = min(low, values.min())
+        high = max(high, values.max())
+        for i, threshold in enumerate(HEALTH_THRESHOLDS):
+            below[i] += np.count_nonzero(values < threshold)
+
+    if count == 0:
+        return {
+            "valid_pixels": 0,
+            "mean": None,
+            "min": None,
+            "max": None,
+            "median": None,
+            "health_distribution": {},
+        }
+
+    # class counts from the cumulative "below threshold" counts
+    cumulative = np.append(below, count)
+    health = np.diff(cumulative, prepend=0)
+
+    # middle element(s) in sorted order; two of them for an even count
+    rank_lo, rank_hi = (count - 1) // 2, count // 2
+    valid_values = valid_values[:count]
+    valid_values.partition([rank_lo, rank_hi])
+    # same float32 averaging np.nanmedian does
+    median = (valid_values[rank_lo] + valid_values[rank_hi]) / np.float32(2)
+
+    return {
+        "valid_pixels": count,
+        "mean": total / count,
+        "min": float(low),
+        "max": float(high),
+        "median": float(median),
+        "health_distribution": {label: int(n) for label, n in zip(HEALTH_LABELS, health)},
+    }
+
+
+# Histogram resolution for mergeable (tiled) statistics: 0.001 NDVI per bin over [-1, 1]
+ACCUMULATOR_BINS = 2000
+
+
+class NDVIStatsAccumulator:
+    """
+    Mergeable NDVI statistics for rasters processed tile by tile.
+
+    add() folds one tile into fixed-size state (count, sum, min, max, health
+    class counts and a value histogram), so memory doesn't grow with the
+    area. Accumulators from different tiles/workers can be merge()d. The
+    median is estimated from the histogram (within one bin, 0.001 NDVI).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.low = np.float32(np.inf)
+        self.high = np.float32(-np.inf)
+        self.below = np.zeros(len(HEALTH_THRESHOLDS), dtype=np.int64)
+        self.histogram = np.zeros(ACCUMULATOR_BINS, dtype=np.int64)
+
+    def add(self, ndvi_array: np.ndarray, chunk_size: int = CHUNK_SIZE):
+        flat = np.asarray(ndvi_array, dtype=np.float32).reshape(-1)
+        for start in range(0, flat.size, chunk_size):
+            chunk = flat[start:start + chunk_size]
+            values = chunk[~np.isnan(chunk)]
+            if values.size == 0:
+                continue
+            self.count += values.size
+            self.total += float(np.add.reduce(values, dtype=np.float64))
+            self.low = min(self.low, values.min())
+            self.high = max(self.high, values.max())
+            for i, threshold in enumerate(HEALTH_THRESHOLDS):
+                self.below[i] += np.count_nonzero(values < threshold)
+            bins = ((values + np.float32(1.0)) * np.float32(ACCUMULATOR_BINS / 2)).astype(np.intp)
+            np.clip(bins, 0, ACCUMULATOR_BINS - 1, out=bins)
+            self.histogram += np.bincount(bins, minlength=ACCUMULATOR_BINS)
+        return self
+
+    def merge(self, other: "NDVIStatsAccumulator"):
+        self.count += other.count
+        self.total += other.total
+        self.low = min(self.low, other.low)
+        self.high = max(self.high, other.high)
+        self.below += other.below
+        self.histogram += other.histogram
+        return self
+
+    def _value_at_rank(self, cumulative: np.ndarray, rank: int) -> float:
+        # interpolate inside the bin that holds this rank (0 = smallest value)
+        b = int(np.searchsorted(cumulative, rank, side="right"))
+        before = int(cumulative[b - 1]) if b > 0 else 0
+        fraction = (rank - before + 0.5) / self.histogram[b]
+        value = -1.0 + (b + fraction) * (2.0 / ACCUMULATOR_BINS)
+        return min(max(value, float(self.low)), float(self.high))
+
+    def median(self) -> float:
+        # middle rank(s) like ndvi_stats: two of them, averaged, for an even count
+        cumulative = np.cumsum(self.histogram)
+        rank_lo, rank_hi = (self.count - 1) // 2, self.count // 2
+        return (self._value_at_rank(cumulative, rank_lo) + self._value_at_rank(cumulative, rank_hi)) / 2
+
+    def result(self) -> Dict:
+        """Same shape as ndvi_stats(); median is the histogram estimate."""
+        if self.count == 0:
+            return {
+                "valid_pixels": 0,
+                "mean": None,
+                "min": None,
+                "max": None,
+                "median": None,
+                "health_distribution": {},
+            }
+        health = np.diff(np.append(self.below, self.count), prepend=0)
+        return {
+            "valid_pixels": self.count,
+            "mean": self.total / self.count,
+            "min": float(self.low),
+            "max": float(self.high),
+            "median": self.median(),
+            "health_distribution": {label: int(n) for label, n in zip(HEALTH_LABELS, health)},
+        }
@@ -0,0 +1,194 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect # type: ignore
+from sqlalchemy.exc import IntegrityError # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+
+from app.core.config import settings
+from app.models import db_model
+
+logger = logging.getLogger(__name__)
+
+
+def last_final_day() -> date:
+    """Newest day whose scenes are all available (older than ndvi_final_after_days)."""
+    return date.today() - timedelta(days=settings.ndvi_final_after_days + 1)
+
+
+def is_final_window(end_date: str) -> bool:
+    """Whether a window ending on end_date (YYYY-MM-DD) can no longer get new scenes."""
+    try:
+        return datetime.strptime(end_date, "%Y-%m-%d").date() <= last_final_day()
+    except ValueError:
+        return False
+
+
+def field_center(field: db_model.Field) -> Tuple[float, float]:
+    return (field.north + field.south) / 2, (field.east + field.west) / 2
+
+
+def store_available(db: Session) -> bool:
+    """Whether the store's tables exist (a database that wasn't migrated yet has none, see app/core/init_db.py)."""
+    inspector = inspect(db.get_bind())
+    return all(inspector.has_table(model.__tablename__) for model in (db_model.NDVIObservation, db_model.NDVISyncState))
+
+
+def missing_ranges(state: Optional[db_model.NDVISyncState], start: date, end: date) -> List[Tuple[date, date]]:
+    """Parts of [start, end] not yet fetched for a field (at most one before and one after the covered range)."""
+    if state is None or state.covered_until < start or state.covered_from > end:
+        return [(start, end)]
+    ranges = []
+    if start < state.covered_from:
+        ranges.append((start, state.covered_from - timedelta(days=1)))
+    if state.covered_until < end:
+        ranges.append((state.covered_until + timedelta(days=1), end))
+    return ranges
+
+
+def sync_field(db: Session, ndvi_service, field: db_model.Field, start: date, end: date) -> int:
+    """
+    Make sure every acquisition between start and end is stored for the field.
+
+    Only the dates outside the field's covered range are fetched, each gap
+    with one multi-temporal request. Days after last_final_day() aren't marked
+    as covered since their scenes can still arrive. Returns the number of
+    upstream requests.
+    """
+    state = db.get(db_model.NDVISyncState, field.id)
+    ranges = missing_ranges(state, start, end)
+    if not ranges:
+        return 0
+
+    lat, lon = field_center(field)
+    for range_start, range_end in ranges:
+        observations = ndvi_service.fetch_ndvi_observations(
+            lat, lon, range_start.strftime("%Y-%m-%d"), range_end.strftime("%Y-%m-%d")
+        )
+        _store_observations(db, field.id, observations)
+        logger.debug(f"Field {field.id}: stored {len(observations)} observations for {range_start}..{range_end}")
+
+    covered_until = min(end, last_final_day())
+    if covered_until >= start:
+        if state is None:
+            db.add(db_model.NDVISyncState(field_id=field.id, covered_from=start, covered_until=covered_until))
+        elif state.covered_until >= start - timedelta(days=1) and state.covered_from <= end + timedelta(days=1):
+            state.covered_from = min(state.covered_from, start)
+            state.covered_until = max(state.covered_until, covered_until)
+        else:
+            # the old range doesn't touch the new one; its observations stay stored
+            state.covered_from, state.covered_until = start, covered_until
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # another request synced the same field concurrently
+    return len(ranges)
+
+
+def _store_observations(db: Session, field_id: int, observations: List[Dict]):
+    if not observations:
+        return
+    dates = [datetime.strptime(o["date"], "%Y-%m-%d").date() for o in observations]
+    existing = {
+        row.date: row for row in db.query(db_model.NDVIObservation).filter(
+            db_model.NDVIObservation.field_id == field_id,
+            db_model.NDVIObservation.date.in_(dates)
+        )
+    }
+    for observation_date, observation in zip(dates, observations):
+        values = {
+            "ndvi_value": observation["ndvi_value"],
+            "average_ndvi": observation["average_ndvi"],
+            "min_ndvi": observation["min_ndvi"],
+            "max_ndvi": observation["max_ndvi"],
+            "vegetation_health": observation["vegetation_health"],
+            "valid_pixel_count": observation["valid_pixel_count"],
+        }
+        row = existing.get(observation_date)
+        if row is None:
+            db.add(db_model.NDVIObservation(field_id=field_id, date=observation_date, **values))
+        elif observation["valid_pixel_count"] > row.valid_pixel_count:
+            # a same-day scene processed later with more clear pixels
+            for key, value in values.items():
+                setattr(row, key, value)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # stored concurrently by another request; theirs is just as good
+
+
+def stored_observations(db: Session, field_id: int, start: date, end: date) -> List[Dict]:
+    rows = db.query(db_model.NDVIObservation).filter(
+        db_model.NDVIObservation.field_id == field_id,
+        db_model.NDVIObservation.date >= start,
+        db_model.NDVIObservation.date <= end
+    ).order_by(db_model.NDVIObservation.date).all()
+    return [
+        {
+            "date": row.date.strftime("%Y-%m-%d"),
+            "ndvi_value": row.ndvi_value,
+            "average_ndvi": row.average_ndvi,
+            "min_ndvi": row.min_ndvi,
+            "max_ndvi": row.max_ndvi,
+            "vegetation_health": row.vegetation_health,
+            "valid_pixel_count": row.valid_pixel_count,
+        }
+        for row in rows
+    ]
+
+
+def get_field_history(db: Session, ndvi_service, field: db_model.Field, days: int, step_days: int) -> List[Dict]:
+    """
+    NDVI history for a field from the observation store, fetching only the
+    dates not stored yet. One point per step_days bucket, oldest first.
+    Without the store tables the whole series is fetched every time
+    (NDVIService.get_ndvi_time_series).
+    """
+    if not store_available(db):
+        logger.warning("NDVI observation store tables missing, run python -m app.core.init_db; fetching without the store")
+        lat, lon = field_center(field)
+        return ndvi_service.get_ndvi_time_series(lat, lon, days, step_days)
+    today = date.today()
+    start = today - timedelta(days=days)
+    sync_field(db, ndvi_service, field, start, today)
+    return ndvi_service.select_per_step(stored_observations(db, field.id, start, today), step_days)
+
+
+def backfill_all(session_factory: Callable[[], Session], ndvi_service, days: int,
+                 workers: int = 4, field_ids: Optional[List[int]] = None) -> Dict:
+    """
+    Fill the store for all fields (or `field_ids`) for the last `days` days.
+    Fields are synced `workers` at a time, each on its own DB session.
+    """
+    db = session_factory()
+    try:
+        query = db.query(db_model.Field.id)
+        if field_ids:
+            query = query.filter(db_model.Field.id.in_(field_ids))
+        ids = [field_id for (field_id,) in query.all()]
+    finally:
+        db.close()
+
+    today = date.today()
+    start = today - timedelta(days=days)
+
+    def backfill_field(field_id: int) -> int:
+        session = session_factory()
+        try:
+            field = session.get(db_model.Field, field_id)
+            return sync_field(session, ndvi_service, field, start, today)
+        finally:
+            session.close()
+
+    summary = {"fields": len(ids), "requests": 0, "failed": []}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ndvi-backfill") as pool:
+        futures = {pool.submit(backfill_field, field_id): field_id for field_id in ids}
+        for future in as_completed(futures):
+            try:
+                summary["requests"] += future.result()
+            except Exception as e:
+                logger.error(f"Backfill failed for field {futures[future]}: {e}")
+                summary["failed"].append(futures[future])
+    return summary
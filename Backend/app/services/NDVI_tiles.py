@@ -0,0 +1,215 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+import numpy as np
+
+# Web Mercator (EPSG:3857) half extent in metres; XYZ tiles are 256 px
+MERCATOR_ORIGIN = 20037508.342789244
+TILE_SIZE = 256
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of an XYZ tile in EPSG:3857 metres."""
+    size = 2 * MERCATOR_ORIGIN / (1 << z)
+    west = -MERCATOR_ORIGIN + x * size
+    north = MERCATOR_ORIGIN - y * size
+    return west, north - size, west + size, north
+
+
+def tile_bounds_wgs84(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of an XYZ tile in degrees."""
+    n = 1 << z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def downsample(ndvi_array: np.ndarray, factor: int) -> np.ndarray:
+    """Mean of each factor x factor block, ignoring NaN (all-NaN blocks stay NaN)."""
+    if factor == 1:
+        return np.asarray(ndvi_array, dtype=np.float32)
+    height, width = ndvi_array.shape
+    blocks = np.asarray(ndvi_array, dtype=np.float32).reshape(height // factor, factor, width // factor, factor)
+    valid = ~np.isnan(blocks)
+    counts = valid.sum(axis=(1, 3))
+    sums = np.where(valid, blocks, np.float32(0)).sum(axis=(1, 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.float32(np.nan)).astype(np.float32)
+
+
+def upsample(ndvi_array: np.ndarray, factor: int) -> np.ndarray:
+    """Nearest neighbour: each pixel becomes a factor x factor block."""
+    if factor == 1:
+        return np.asarray(ndvi_array, dtype=np.float32)
+    return np.repeat(np.repeat(np.asarray(ndvi_array, dtype=np.float32), factor, axis=0), factor, axis=1)
+
+
+class TilePyramid:
+    """
+    NDVI heatmap tiles for a web map, rendered lazily from cached float rasters.
+
+    Tiles at meta_zoom and deeper are cut out of their metatile, one
+    `meta_zoom` tile fetched at `metatile_px` (about the native 10 m of
+    Sentinel-2), averaged down or pixel-repeated to 256 px. Tiles above
+    meta_zoom are built from their four children, 2x averaged, when all the
+    metatiles under them are already cached; otherwise the tile itself is
+    fetched at 256 px (one request instead of 4**(meta_zoom - z) metatiles).
+
+    Metatiles, low-zoom NDVI tiles (float16) and rendered PNGs share one
+    LRU bounded by `max_bytes`. Entries can be given a ttl, for windows
+    that can still get new scenes.
+    """
+
+    def __init__(self, fetch_tile: Callable[[Tuple[str, str], int, int, int, int], np.ndarray],
+                 render: Callable[[np.ndarray], bytes], meta_zoom: int, metatile_px: int,
+                 min_zoom: int, max_zoom: int, max_bytes: int):
+        """fetch_tile(window, z, x, y, px) returns the px x px float NDVI raster of tile z/x/y."""
+        self._fetch_tile = fetch_tile
+        self._render = render
+        self.meta_zoom = meta_zoom
+        self.metatile_px = metatile_px
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.metatiles_fetched = 0
+        self.tiles_fetched = 0
+        self._empty_png: Optional[bytes] = None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[object, Optional[float], int]]" = OrderedDict()
+        self._total_bytes = 0
+
+    def check_tile(self, z: int, x: int, y: int):
+        if not self.min_zoom <= z <= self.max_zoom:
+            raise ValueError(f"Zoom must be between {self.min_zoom} and {self.max_zoom}")
+        if not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            raise ValueError(f"Tile {z}/{x}/{y} does not exist")
+
+    def png(self, z: int, x: int, y: int, window: Tuple[str, str], ttl_s: Optional[float] = None) -> bytes:
+        self.check_tile(z, x, y)
+        key = ("png", window, z, x, y)
+        png = self._get(key)
+        if png is None:
+            png = self._render(self.ndvi(z, x, y, window, ttl_s))
+            self._put(key, png, len(png), ttl_s)
+        return png
+
+    def empty_png(self, z: int, x: int, y: int) -> bytes:
+        """Fully transparent tile, for tiles nobody needs data for."""
+        self.check_tile(z, x, y)
+        if self._empty_png is None:
+            self._empty_png = self._render(np.full((TILE_SIZE, TILE_SIZE), np.nan, dtype=np.float32))
+        return self._empty_png
+
+    def ndvi(self, z: int, x: int, y: int, window: Tuple[str, str], ttl_s: Optional[float] = None) -> np.ndarray:
+        """256 x 256 float NDVI for a tile (NaN = cloud / no data)."""
+        if z >= self.meta_zoom:
+            return self._cut(z, x, y, window, ttl_s)
+
+        key = ("ndvi", window, z, x, y)
+        tile = self._get(key)
+        if tile is not None:
+            return tile
+
+        if self._metatiles_cached(z, x, y, window):
+            children = np.empty((2 * TILE_SIZE, 2 * TILE_SIZE), dtype=np.float32)
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    children[dy * TILE_SIZE:(dy + 1) * TILE_SIZE, dx * TILE_SIZE:(dx + 1) * TILE_SIZE] = \
+                        self.ndvi(z + 1, 2 * x + dx, 2 * y + dy, window, ttl_s)
+            tile = downsample(children, 2).astype(np.float16)
+        else:
+            tile = np.asarray(self._fetch_tile(window, z, x, y, TILE_SIZE), dtype=np.float16)
+            with self._lock:
+                self.tiles_fetched += 1
+        self._put(key, tile, tile.nbytes, ttl_s)
+        return tile
+
+    def _cut(self, z: int, x: int, y: int, window: Tuple[str, str], ttl_s: Optional[float]) -> np.ndarray:
+        depth = z - self.meta_zoom
+        meta_x, meta_y = x >> depth, y >> depth
+        metatile = self._metatile(meta_x, meta_y, window, ttl_s)
+        span = self.metatile_px >> depth  # metatile pixels across this tile
+        if span == 0:
+            # the whole tile lies inside one metatile pixel
+            scale = (1 << depth) // self.metatile_px
+            row, col = (y - (meta_y << depth)) // scale, (x - (meta_x << depth)) // scale
+            return np.full((TILE_SIZE, TILE_SIZE), metatile[row, col], dtype=np.float32)
+        row, col = (y - (meta_y << depth)) * span, (x - (meta_x << depth)) * span
+        window_px = metatile[row:row + span, col:col + span]
+        if span >= TILE_SIZE:
+            return downsample(window_px, span // TILE_SIZE)
+        return upsample(window_px, TILE_SIZE // span)
+
+    def _metatile(self, meta_x: int, meta_y: int, window: Tuple[str, str], ttl_s: Optional[float]) -> np.ndarray:
+        key = ("meta", window, meta_x, meta_y)
+        metatile = self._get(key)
+        if metatile is None:
+            metatile = np.asarray(self._fetch_tile(window, self.meta_zoom, meta_x, meta_y, self.metatile_px),
+                                  dtype=np.float16)
+            with self._lock:
+                self.metatiles_fetched += 1
+            self._put(key, metatile, metatile.nbytes, ttl_s)
+        return metatile
+
+    def _metatiles_cached(self, z: int, x: int, y: int, window: Tuple[str, str]) -> bool:
+        """Whether every metatile under a low-zoom tile is cached, so it can be built without a fetch."""
+        depth = self.meta_zoom - z
+        return all(
+            self._contains(("meta", window, meta_x, meta_y))
+            for meta_y in range(y << depth, (y + 1) << depth)
+            for meta_x in range(x << depth, (x + 1) << depth)
+        )
+
+    def _contains(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def _get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self._total_bytes -= size
+            self.misses += 1
+            return None
+
+    def _put(self, key: Hashable, value, size: int, ttl_s: Optional[float]):
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)  # shared between requests
+        expires_at = time.monotonic() + ttl_s if ttl_s is not None else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "metatiles_fetched": self.metatiles_fetched,
+                "tiles_fetched": self.tiles_fetched,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
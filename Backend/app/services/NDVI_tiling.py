@@ -0,0 +1,39 @@
+import math
+import numpy as np
+from typing import List, Tuple
+from sentinelhub import BBox  # type: ignore
+
+# Sentinel Hub Process API refuses outputs larger than this on either side
+SH_MAX_OUTPUT_PX = 2500
+
+
+def split_bbox(bbox: BBox, size: Tuple[int, int], max_tile_px: int) -> List[Tuple[BBox, Tuple[int, int]]]:
+    """
+    Split a bbox rendered at `size` (width, height) into a grid of tiles no
+    larger than `max_tile_px` on either side.
+
+    Tile edges fall on whole output pixels, so the tiles together cover
+    exactly the same pixels as the single request would (just in pieces).
+    Returns a list of (tile_bbox, (tile_width, tile_height)).
+    """
+    max_tile_px = max(1, min(max_tile_px, SH_MAX_OUTPUT_PX))
+    width, height = size
+    nx = max(1, math.ceil(width / max_tile_px))
+    ny = max(1, math.ceil(height / max_tile_px))
+    col_edges = np.round(np.linspace(0, width, nx + 1)).astype(int)
+    row_edges = np.round(np.linspace(0, height, ny + 1)).astype(int)
+
+    deg_per_col = (bbox.max_x - bbox.min_x) / width
+    deg_per_row = (bbox.max_y - bbox.min_y) / height
+
+    tiles = []
+    for j in range(ny):
+        # rows count down from the north edge, like the output raster
+        north = bbox.max_y - row_edges[j] * deg_per_row
+        south = bbox.max_y - row_edges[j + 1] * deg_per_row
+        for i in range(nx):
+            west = bbox.min_x + col_edges[i] * deg_per_col
+            east = bbox.min_x + col_edges[i + 1] * deg_per_col
+            tile_size = (int(col_edges[i + 1] - col_edges[i]), int(row_edges[j + 1] - row_edges[j]))
+            tiles.append((BBox([west, south, east, north], crs=bbox.crs), tile_size))
+    return tiles
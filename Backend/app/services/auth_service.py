@@ -1,14 +1,14 @@
 from passlib.context import CryptContext # type: ignore
 from datetime import datetime, timedelta
 from jose import jwt # type: ignore
-from typing import Optional
+from typing import Optional, Tuple
 import os
 from app.core.config import Settings
 
 settings = Settings()
 
-# Password hashing config
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing config; hashes made with a different cost count as outdated
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 
 # JWT settings
 SECRET_KEY = settings.jwt_secret
@@ -21,10 +21,13 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash uses an outdated cost/scheme."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    print("ENCODE SECRET_KEY:", SECRET_KEY)
     return encoded_jwt
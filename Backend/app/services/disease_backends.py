@@ -0,0 +1,96 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class KerasBackend:
+    """Full TensorFlow/Keras model (the original inference path)."""
+
+    name = "keras"
+
+    def __init__(self, model_path: str):
+        import tensorflow as tf  # type: ignore  # heavy, only imported when this backend is used
+
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(batch)
+
+
+class TFLiteBackend:
+    """
+    Converted .tflite model on the TFLite interpreter.
+
+    Uses the standalone `tflite_runtime` package when installed (no full
+    TensorFlow import), otherwise `tf.lite.Interpreter`. Handles int8
+    quantized inputs/outputs by applying the model's scale and zero point.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        try:
+            from tflite_runtime.interpreter import Interpreter  # type: ignore
+        except ImportError:
+            import tensorflow as tf  # type: ignore
+
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self.input_details["shape"][0])
+        # the interpreter keeps state between set_tensor/invoke/get_tensor
+        self._lock = threading.Lock()
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self.input_details["index"], list(batch.shape))
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+
+            self.interpreter.set_tensor(self.input_details["index"], self._quantize_input(batch))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output_details["index"])
+        return self._dequantize_output(output)
+
+    def _quantize_input(self, batch: np.ndarray) -> np.ndarray:
+        dtype = self.input_details["dtype"]
+        if dtype == np.float32:
+            return batch.astype(np.float32, copy=False)
+        scale, zero_point = self.input_details["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize_output(self, output: np.ndarray) -> np.ndarray:
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = self.output_details["quantization"]
+        return (output.astype(np.float32) - zero_point) * scale
+
+
+def load_disease_backend(backend: str, keras_model_path: str, tflite_model_path: str = "", num_threads: int = 0):
+    """
+    Load the configured inference backend.
+
+    `backend` is "keras", "tflite" or "auto" (tflite if a converted model is
+    configured). If the TFLite model can't be loaded we fall back to Keras.
+    """
+    if backend in ("tflite", "auto") and tflite_model_path:
+        try:
+            loaded = TFLiteBackend(tflite_model_path, num_threads=num_threads)
+            logger.info(f"Disease model: TFLite backend ({tflite_model_path})")
+            return loaded
+        except Exception as e:
+            logger.warning(f"Could not load TFLite disease model, falling back to Keras: {e}")
+    elif backend == "tflite":
+        logger.warning("disease_backend=tflite but no disease_tflite_model_path set, using Keras")
+
+    logger.info(f"Disease model: Keras backend ({keras_model_path})")
+    return KerasBackend(keras_model_path)
@@ -0,0 +1,21 @@
+import io
+
+import numpy as np
+from PIL import Image # type: ignore
+
+# Model input size (height, width)
+IMAGE_SIZE = (128, 128)
+
+
+def preprocess_image(image_bytes) -> np.ndarray:
+    """
+    Decode an uploaded image into the model's (128, 128, 3) float input, scaled to [0, 1].
+
+    Same result as keras load_img(target_size=(128, 128)) + img_to_array / 255,
+    but without importing TensorFlow.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img = img.resize((IMAGE_SIZE[1], IMAGE_SIZE[0]), Image.NEAREST)
+    return np.asarray(img, dtype=np.float32) / 255.0
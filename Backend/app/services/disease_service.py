@@ -1,12 +1,19 @@
-import tensorflow as tf # type: ignore
 import numpy as np
 from app.core.config import settings  # type: ignore
-from tensorflow.keras.preprocessing import image # type: ignore
+from app.core.readiness import lazy_resource
+from app.services.disease_backends import load_disease_backend
+from app.services.disease_preprocessing import preprocess_image
 import os
-import io
+from typing import List, Dict
 
-# Load model once at startup
-model = tf.keras.models.load_model(settings.disease_model_path)
+# Model is loaded on first use (or by the startup warm-up), not at import time.
+# Keras, or a converted TFLite model - see disease_backends
+disease_model = lazy_resource("disease_model", lambda: load_disease_backend(
+    settings.disease_backend,
+    settings.disease_model_path,
+    settings.disease_tflite_model_path,
+    num_threads=settings.disease_tflite_threads
+))
 
 # Class labels
 class_labels = [
@@ -15,12 +22,30 @@ class_labels = [
     'Stem fly', 'Tan spot', 'Yellow Rust'
 ]
 
-def predict_disease(image_bytes) -> str:
-    # Read from bytes instead of path
-    img = image.load_img(io.BytesIO(image_bytes), target_size=(128, 128))
-    img_array = image.img_to_array(img) / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
+def predict_disease_batch(img_arrays: List[np.ndarray]) -> List[str]:
+    """Run one forward pass over preprocessed images and return one label per image."""
+    prediction = disease_model.get().predict(np.stack(img_arrays))
+    return [class_labels[i] for i in np.argmax(prediction, axis=1)]
+
+def predict_disease_top_k(img_arrays: List[np.ndarray], k: int = 3) -> List[Dict]:
+    """
+    One forward pass over preprocessed images; for each image returns the
+    predicted label and the k most likely classes with their probabilities.
+    """
+    prediction = disease_model.get().predict(np.stack(img_arrays))
+    k = max(1, min(k, len(class_labels)))
+    top = np.argsort(-prediction, axis=1)[:, :k]
+    results = []
+    for probs, indices in zip(prediction, top):
+        results.append({
+            "prediction": class_labels[indices[0]],
+            "top_k": [
+                {"label": class_labels[i], "probability": round(float(probs[i]), 4)}
+                for i in indices
+            ]
+        })
+    return results
 
-    prediction = model.predict(img_array)
-    predicted_class = class_labels[np.argmax(prediction)]
-    return predicted_class
+def predict_disease(image_bytes) -> str:
+    img_array = preprocess_image(image_bytes)
+    return predict_disease_batch([img_array])[0]
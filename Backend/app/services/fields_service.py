@@ -0,0 +1,47 @@
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy import inspect, text # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+
+from app.core.migrations import FIELDS_RTREE
+from app.models import db_model
+
+
+def field_geometry(field: db_model.Field) -> Optional[Dict]:
+    """The field's polygon as a GeoJSON dict, or None for rectangle-only fields."""
+    return json.loads(field.geometry) if field.geometry else None
+
+
+def _has_rtree(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != "sqlite":
+        return False
+    return inspect(bind).has_table(FIELDS_RTREE)
+
+
+def fields_intersecting(db: Session, west: float, south: float, east: float, north: float,
+                        user_id: Optional[int] = None) -> List[db_model.Field]:
+    """
+    Fields whose bounding box intersects the given one.
+
+    On SQLite the R*Tree narrows the candidates first; its 32-bit float
+    boxes are rounded outwards, so the exact check on the real columns
+    still runs on the candidates.
+    """
+    query = db.query(db_model.Field)
+    if _has_rtree(db):
+        candidates = text(
+            f"SELECT id FROM {FIELDS_RTREE} "
+            "WHERE min_lon <= :east AND max_lon >= :west AND min_lat <= :north AND max_lat >= :south"
+        ).bindparams(west=west, south=south, east=east, north=north)
+        query = query.filter(db_model.Field.id.in_(candidates))
+    query = query.filter(
+        db_model.Field.west <= east,
+        db_model.Field.east >= west,
+        db_model.Field.south <= north,
+        db_model.Field.north >= south
+    )
+    if user_id is not None:
+        query = query.filter(db_model.Field.user_id == user_id)
+    return query.order_by(db_model.Field.id).all()
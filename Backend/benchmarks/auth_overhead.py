@@ -0,0 +1,99 @@
+"""
+Microbenchmark: auth cost per request in get_current_user, with and without
+the token cache.
+
+    python benchmarks/auth_overhead.py
+    python benchmarks/auth_overhead.py --requests 20000 --users 50
+    python benchmarks/auth_overhead.py --database-url sqlite:////tmp/zarkhez-copy.db
+
+Each simulated request does what FastAPI does for a protected route: open a
+session (get_db), run get_current_user with a bearer token, close the
+session. "uncached" decodes the JWT and queries the users table every time
+(the old behaviour); "cached" is the default TokenCache. Without
+--database-url a throwaway SQLite database with --users users is used.
+Needs the usual settings (.env) for the JWT secret.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine  # noqa: E402  # type: ignore
+from sqlalchemy.orm import sessionmaker  # noqa: E402  # type: ignore
+
+from app.core import security  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.token_cache import TokenCache  # noqa: E402
+from app.models import db_model  # noqa: E402
+from app.services.auth_service import create_access_token  # noqa: E402
+
+
+def make_tokens(session_factory, users: int) -> list:
+    db = session_factory()
+    try:
+        ids = [user_id for (user_id,) in db.query(db_model.User.id).limit(users)]
+        for i in range(len(ids), users):
+            user = db_model.User(phone=f"+92300{i:07d}", name=f"bench {i}", hashed_password="x")
+            db.add(user)
+            db.flush()
+            ids.append(user.id)
+        db.commit()
+    finally:
+        db.close()
+    return [create_access_token({"sub": str(user_id)}) for user_id in ids]
+
+
+def run(session_factory, tokens: list, requests: int) -> list:
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        db = session_factory()
+        try:
+            security.get_current_user(db, tokens[i % len(tokens)])
+        finally:
+            db.close()
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+
+def summarize(label: str, latencies: list):
+    ordered = sorted(latencies)
+    pct = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+    print(f"{label:>9}: mean={statistics.fmean(ordered):8.1f} us  p50={statistics.median(ordered):8.1f} us  "
+          f"p99={pct(99):8.1f} us  ({1e6 / statistics.fmean(ordered):,.0f} auth/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20, help="distinct users / tokens")
+    parser.add_argument("--database-url", help="default: a temporary SQLite database")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth_bench.db')}"
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    db_model.Base.metadata.create_all(bind=engine, tables=[db_model.User.__table__])
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    tokens = make_tokens(session_factory, args.users)
+
+    print(f"{args.requests} requests over {len(tokens)} tokens ({database_url})")
+    security.token_cache = TokenCache(ttl_s=0)
+    run(session_factory, tokens, min(200, args.requests))  # warm up connections
+    uncached = run(session_factory, tokens, args.requests)
+
+    security.token_cache = TokenCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_s)
+    cached = run(session_factory, tokens, args.requests)
+
+    summarize("uncached", uncached)
+    summarize("cached", cached)
+    print(f"speedup: {statistics.fmean(uncached) / statistics.fmean(cached):.1f}x  "
+          f"(a dashboard load makes ~5 authenticated calls)")
+    print(f"cache: {security.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Concurrency benchmark: reads and writes on the fields table, with the old
+engine setup vs the tuned profile from app.core.database.
+
+    python benchmarks/db_concurrency.py
+    python benchmarks/db_concurrency.py --threads 32 --write-ratio 0.3 --duration 15
+    python benchmarks/db_concurrency.py --database-url postgresql://user:pw@localhost/bench --profiles tuned
+
+Each profile gets a fresh database (a temporary SQLite file unless
+--database-url is given) with the app's tables, --users users and
+--fields fields per user. --threads workers then run for --duration
+seconds; each operation is a write (add a field and commit, like
+POST /fields) with probability --write-ratio, otherwise a read (list
+one user's fields, like GET /fields). Reported: operations per second,
+read/write latency and errors such as "database is locked" or pool
+timeouts.
+
+  legacy: create_engine(url, connect_args={"check_same_thread": False}),
+          as database.py did before (rollback journal, default pool)
+  tuned:  make_engine(url): WAL, synchronous/cache/busy_timeout pragmas,
+          db_pool_* sizing
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine  # noqa: E402  # type: ignore
+from sqlalchemy.orm import sessionmaker  # noqa: E402  # type: ignore
+
+from app.core.database import make_engine  # noqa: E402
+from app.core.migrations import run_migrations  # noqa: E402
+from app.models import db_model  # noqa: E402
+
+PROFILES = {
+    "legacy": lambda url: create_engine(url, connect_args={"check_same_thread": False}),
+    "tuned": make_engine,
+}
+
+
+def random_field(rng: random.Random, user_id: int) -> db_model.Field:
+    west, south = rng.uniform(70.0, 75.0), rng.uniform(28.0, 33.0)
+    return db_model.Field(user_id=user_id, name="bench", west=west, south=south,
+                          east=west + 0.01, north=south + 0.01)
+
+
+def seed(session_factory, users: int, fields_per_user: int) -> list:
+    rng = random.Random(0)
+    db = session_factory()
+    try:
+        user_ids = []
+        for i in range(users):
+            user = db_model.User(phone=f"+92888{i:07d}", name=f"bench {i}", hashed_password="x")
+            db.add(user)
+            db.flush()
+            user_ids.append(user.id)
+            db.add_all([random_field(rng, user.id) for _ in range(fields_per_user)])
+        db.commit()
+        return user_ids
+    finally:
+        db.close()
+
+
+def worker(session_factory, user_ids: list, write_ratio: float, seed_value: int, stop: threading.Event,
+           results: dict):
+    rng = random.Random(seed_value)
+    reads, writes, errors = [], [], {}
+    while not stop.is_set():
+        user_id = rng.choice(user_ids)
+        write = rng.random() < write_ratio
+        started = time.perf_counter()
+        db = session_factory()
+        try:
+            if write:
+                db.add(random_field(rng, user_id))
+                db.commit()
+            else:
+                db.query(db_model.Field).filter(db_model.Field.user_id == user_id).all()
+            (writes if write else reads).append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            db.rollback()
+            message = str(e).splitlines()[0][:80]
+            errors[message] = errors.get(message, 0) + 1
+        finally:
+            db.close()
+    with results["lock"]:
+        results["reads"] += reads
+        results["writes"] += writes
+        for message, count in errors.items():
+            results["errors"][message] = results["errors"].get(message, 0) + count
+
+
+def latency(label: str, latencies: list) -> str:
+    if not latencies:
+        return f"{label} -"
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    return f"{label} p50={statistics.median(ordered):6.1f} ms p99={p99:7.1f} ms"
+
+
+def run_profile(name: str, url: str, args) -> None:
+    engine = PROFILES[name](url)
+    db_model.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    user_ids = seed(session_factory, args.users, args.fields)
+
+    stop = threading.Event()
+    results = {"reads": [], "writes": [], "errors": {}, "lock": threading.Lock()}
+    threads = [
+        threading.Thread(target=worker, args=(session_factory, user_ids, args.write_ratio, i, stop, results),
+                         daemon=True)
+        for i in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    ops = len(results["reads"]) + len(results["writes"])
+    print(f"{name:>7}: {ops / elapsed:8.0f} ops/s  {latency('read', results['reads'])}  "
+          f"{latency('write', results['writes'])}  errors={sum(results['errors'].values())}")
+    for message, count in sorted(results["errors"].items(), key=lambda item: -item[1]):
+        print(f"         {count:6d} x {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["legacy", "tuned"])
+    parser.add_argument("--database-url", help="default: a new temporary SQLite file per profile")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per profile")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--fields", type=int, default=20, help="fields per user")
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.write_ratio:.0%} writes, {args.duration:.0f}s per profile")
+    for name in args.profiles:
+        url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), f'{name}.db')}"
+        run_profile(name, url, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Accuracy parity and latency/memory benchmark: Keras vs TFLite disease model.
+
+    python benchmarks/disease_backends.py --keras-model models/disease.keras \
+        --tflite-model models/disease_int8.tflite --images samples/leaves
+
+Each backend runs in its own subprocess so load time and peak RSS are
+measured separately. The parent then compares the two outputs on the same
+sample images: top-1 agreement and probability differences. If --labels is
+given (a CSV of filename,label) the accuracy of each backend is reported too.
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.disease_preprocessing import preprocess_image  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_worker(args):
+    """Subprocess mode: load one backend, time it, save its probabilities."""
+    from app.services.disease_backends import KerasBackend, TFLiteBackend
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    if args.worker == "keras":
+        backend = KerasBackend(args.keras_model)
+    else:
+        backend = TFLiteBackend(args.tflite_model, num_threads=args.threads)
+    load_s = time.perf_counter() - started
+
+    images = np.load(args.inputs)
+    backend.predict(images[:args.batch_size])  # warm-up
+
+    latencies = []
+    outputs = []
+    for _ in range(args.repeat):
+        outputs = []
+        for i in range(0, len(images), args.batch_size):
+            batch = images[i:i + args.batch_size]
+            started = time.perf_counter()
+            outputs.append(backend.predict(batch))
+            latencies.append((time.perf_counter() - started) * 1000 / len(batch))
+
+    np.save(args.output, np.concatenate(outputs))
+    print(json.dumps({
+        "backend": args.worker,
+        "load_s": round(load_s, 3),
+        "latency_ms_per_image_p50": round(float(np.median(latencies)), 3),
+        "latency_ms_per_image_p95": round(float(np.percentile(latencies, 95)), 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "model_rss_mb": round(peak_rss_mb() - rss_before, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keras-model", required=True)
+    parser.add_argument("--tflite-model", required=True)
+    parser.add_argument("--images", required=True, help="folder of sample leaf images")
+    parser.add_argument("--labels", help="optional CSV: filename,label")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0, help="TFLite interpreter threads (0 = all cores)")
+    # internal: subprocess mode
+    parser.add_argument("--worker", choices=["keras", "tflite"], help=argparse.SUPPRESS)
+    parser.add_argument("--inputs", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    names = sorted(n for n in os.listdir(args.images) if n.lower().endswith(IMAGE_EXTENSIONS))
+    if not names:
+        parser.error(f"no images found in {args.images}")
+    images = []
+    for name in names:
+        with open(os.path.join(args.images, name), "rb") as f:
+            images.append(preprocess_image(f.read()))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = os.path.join(tmp, "inputs.npy")
+        np.save(inputs, np.stack(images))
+
+        reports, probs = {}, {}
+        for backend in ("keras", "tflite"):
+            output = os.path.join(tmp, f"{backend}.npy")
+            cmd = [
+                sys.executable, __file__, "--worker", backend, "--inputs", inputs, "--output", output,
+                "--keras-model", args.keras_model, "--tflite-model", args.tflite_model,
+                "--images", args.images, "--batch-size", str(args.batch_size),
+                "--repeat", str(args.repeat), "--threads", str(args.threads),
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            reports[backend] = json.loads(result.stdout.strip().splitlines()[-1])
+            probs[backend] = np.load(output)
+
+    from app.services.disease_service import class_labels  # noqa: E402  (labels only)
+
+    keras_top1 = probs["keras"].argmax(axis=1)
+    tflite_top1 = probs["tflite"].argmax(axis=1)
+    diff = np.abs(probs["keras"] - probs["tflite"])
+
+    print(f"Images: {len(names)}  batch size: {args.batch_size}\n")
+    print(f"{'backend':>8} {'load s':>8} {'p50 ms/img':>11} {'p95 ms/img':>11} {'peak RSS MB':>12}")
+    for backend, r in reports.items():
+        print(f"{backend:>8} {r['load_s']:>8} {r['latency_ms_per_image_p50']:>11} "
+              f"{r['latency_ms_per_image_p95']:>11} {r['peak_rss_mb']:>12}")
+
+    print(f"\nTop-1 agreement: {np.mean(keras_top1 == tflite_top1) * 100:.2f}%")
+    print(f"Probability diff: mean={diff.mean():.5f}  max={diff.max():.5f}")
+
+    if args.labels:
+        with open(args.labels, newline="") as f:
+            truth = {row[0]: row[1] for row in csv.reader(f) if len(row) >= 2}
+        rows = [i for i, n in enumerate(names) if n in truth]
+        if rows:
+            expected = np.array([truth[names[i]] for i in rows])
+            for backend, top1 in (("keras", keras_top1), ("tflite", tflite_top1)):
+                predicted = np.array([class_labels[i] for i in top1[rows]])
+                print(f"{backend} accuracy: {np.mean(predicted == expected) * 100:.2f}% ({len(rows)} labelled)")
+
+
+if __name__ == "__main__":
+    main()
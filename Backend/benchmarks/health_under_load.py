@@ -0,0 +1,108 @@
+"""
+Load test: /health latency while NDVI requests are in flight.
+
+Run the API first (uvicorn app.main:app), then e.g.:
+
+    python benchmarks/health_under_load.py --token <JWT> --field-id 1 \
+        --start-date 2024-05-01 --end-date 2024-05-10 --concurrency 8
+
+The script measures /health latency on an idle server, then again while
+`--concurrency` clients keep hitting an NDVI endpoint. With the blocking work
+on the io/cpu pools the two distributions should be about the same.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+
+
+NDVI_ENDPOINTS = {
+    "analyze": "/ndvi/ndvi/analyze",
+    "heatmap": "/ndvi/ndvi/heatmap",
+    "image": "/ndvi/ndvi/image",
+    "history": "/ndvi/ndvi/history",
+}
+
+
+def probe_health(base_url: str, duration: float, interval: float) -> list:
+    latencies = []
+    session = requests.Session()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        session.get(f"{base_url}/health", timeout=60).raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+    return latencies
+
+
+def ndvi_client(base_url: str, path: str, headers: dict, body: dict, stop: threading.Event, counters: dict):
+    session = requests.Session()
+    while not stop.is_set():
+        try:
+            response = session.post(f"{base_url}{path}", json=body, headers=headers, timeout=300)
+            key = "ok" if response.status_code < 400 else "errors"
+        except requests.RequestException:
+            key = "errors"
+        with counters["lock"]:
+            counters[key] += 1
+
+
+def summarize(label: str, latencies: list):
+    if not latencies:
+        print(f"{label:>10}: no samples")
+        return
+    ordered = sorted(latencies)
+    pct = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+    print(f"{label:>10}: n={len(ordered):4d}  p50={statistics.median(ordered):7.1f} ms  "
+          f"p95={pct(95):7.1f} ms  p99={pct(99):7.1f} ms  max={ordered[-1]:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True, help="Bearer token from /auth/token")
+    parser.add_argument("--field-id", type=int, required=True)
+    parser.add_argument("--start-date", required=True)
+    parser.add_argument("--end-date", required=True)
+    parser.add_argument("--endpoint", choices=sorted(NDVI_ENDPOINTS), default="analyze")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between /health probes")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    if args.endpoint == "history":
+        body = {"field_id": args.field_id, "days": 90, "step_days": 7}
+    else:
+        body = {"field_id": args.field_id, "start_date": args.start_date, "end_date": args.end_date}
+
+    print(f"Phase 1: idle server ({args.duration:.0f}s)")
+    idle = probe_health(args.base_url, args.duration, args.interval)
+
+    print(f"Phase 2: {args.concurrency} clients on {NDVI_ENDPOINTS[args.endpoint]} ({args.duration:.0f}s)")
+    stop = threading.Event()
+    counters = {"ok": 0, "errors": 0, "lock": threading.Lock()}
+    clients = [
+        threading.Thread(
+            target=ndvi_client,
+            args=(args.base_url, NDVI_ENDPOINTS[args.endpoint], headers, body, stop, counters),
+            daemon=True
+        )
+        for _ in range(args.concurrency)
+    ]
+    for client in clients:
+        client.start()
+    loaded = probe_health(args.base_url, args.duration, args.interval)
+    stop.set()
+
+    print()
+    summarize("idle", idle)
+    summarize("loaded", loaded)
+    print(f"NDVI requests completed: ok={counters['ok']} errors={counters['errors']}")
+
+
+if __name__ == "__main__":
+    main()
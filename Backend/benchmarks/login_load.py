@@ -0,0 +1,120 @@
+"""
+Load test: login throughput and latency under a sign-in burst.
+
+Run the API first (uvicorn app.main:app), then e.g.:
+
+    python benchmarks/login_load.py --register --users 20 --concurrency 32 --duration 20
+
+--register creates --users test accounts first (phones +9299900000xx; an
+existing phone is fine). Then --concurrency clients keep posting
+/auth/token for --duration seconds while /health is probed, and the
+script reports successful logins/s, login latency, how many calls the
+server turned away with 503 (password pool full), and /health latency
+during the burst.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+
+
+def phone(i: int) -> str:
+    return f"+92999000{i:04d}"
+
+
+def register_users(base_url: str, users: int, password: str):
+    session = requests.Session()
+    for i in range(users):
+        response = session.post(f"{base_url}/auth/register", timeout=60,
+                                json={"name": f"load test {i}", "phone": phone(i), "password": password})
+        if response.status_code not in (200, 400):  # 400: already registered
+            response.raise_for_status()
+
+
+def login_client(base_url: str, users: int, password: str, offset: int, stop: threading.Event, results: dict):
+    session = requests.Session()
+    i = offset
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = session.post(f"{base_url}/auth/token", timeout=60,
+                                    data={"username": phone(i % users), "password": password})
+            status = response.status_code
+        except requests.RequestException:
+            status = "error"
+        elapsed = (time.perf_counter() - started) * 1000
+        with results["lock"]:
+            results["status"][status] = results["status"].get(status, 0) + 1
+            if status == 200:
+                results["latencies"].append(elapsed)
+        i += 1
+
+
+def probe_health(base_url: str, stop: threading.Event, interval: float, latencies: list):
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        session.get(f"{base_url}/health", timeout=60).raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+
+
+def summarize(label: str, latencies: list):
+    if not latencies:
+        print(f"{label:>10}: no samples")
+        return
+    ordered = sorted(latencies)
+    pct = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+    print(f"{label:>10}: n={len(ordered):5d}  p50={statistics.median(ordered):7.1f} ms  "
+          f"p95={pct(95):7.1f} ms  p99={pct(99):7.1f} ms  max={ordered[-1]:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--password", default="load-test-password")
+    parser.add_argument("--register", action="store_true", help="create the test accounts first")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between /health probes")
+    args = parser.parse_args()
+
+    if args.register:
+        print(f"Registering {args.users} users")
+        register_users(args.base_url, args.users, args.password)
+
+    print(f"{args.concurrency} clients logging in for {args.duration:.0f}s")
+    stop = threading.Event()
+    results = {"status": {}, "latencies": [], "lock": threading.Lock()}
+    health = []
+    threads = [
+        threading.Thread(target=login_client, args=(args.base_url, args.users, args.password, i, stop, results),
+                         daemon=True)
+        for i in range(args.concurrency)
+    ]
+    threads.append(threading.Thread(target=probe_health, args=(args.base_url, stop, args.interval, health),
+                                    daemon=True))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+    elapsed = time.perf_counter() - started
+
+    print()
+    ok = results["status"].get(200, 0)
+    print(f"logins/s: {ok / elapsed:.1f}  (ok={ok}, responses by status: {results['status']})")
+    summarize("login", results["latencies"])
+    summarize("/health", health)
+    pool = requests.get(f"{args.base_url}/health", timeout=60).json().get("password_pool")
+    if pool:
+        print(f"password pool: {pool}")
+
+
+if __name__ == "__main__":
+    main()
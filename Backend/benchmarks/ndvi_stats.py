@@ -0,0 +1,90 @@
+"""
+Microbenchmark: single-pass NDVI stats kernel vs the original multi-scan code.
+
+    python benchmarks/ndvi_stats.py
+    python benchmarks/ndvi_stats.py --sizes 1000 4000 8000 --cloud 0.3
+
+For each raster size, both implementations run on the same synthetic NDVI
+raster (with a cloud/NaN fraction). The script checks that the rounded
+results match and reports the best-of-N wall time and the peak extra memory
+allocated (tracemalloc) by each.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.NDVI_stats import ndvi_stats  # noqa: E402
+
+
+def legacy_stats(ndvi_array: np.ndarray) -> dict:
+    """The statistics block calculate_ndvi used before NDVI_stats."""
+    if np.isnan(ndvi_array).all():
+        return {"valid_pixels": 0, "mean": None, "min": None, "max": None, "median": None,
+                "health_distribution": {}}
+    return {
+        "valid_pixels": int(np.count_nonzero(~np.isnan(ndvi_array))),
+        "mean": float(np.nanmean(ndvi_array)),
+        "min": float(np.nanmin(ndvi_array)),
+        "max": float(np.nanmax(ndvi_array)),
+        "median": float(np.nanmedian(ndvi_array)),
+        "health_distribution": {
+            "Poor": int(np.sum(ndvi_array < 0.2)),
+            "Fair": int(np.sum((ndvi_array >= 0.2) & (ndvi_array < 0.4))),
+            "Good": int(np.sum((ndvi_array >= 0.4) & (ndvi_array < 0.6))),
+            "Excellent": int(np.sum(ndvi_array >= 0.6)),
+        },
+    }
+
+
+def rounded(stats: dict) -> dict:
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in stats.items()}
+
+
+def measure(func, array: np.ndarray, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(array)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(array)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 5000],
+                        help="raster side lengths in pixels")
+    parser.add_argument("--cloud", type=float, default=0.2, help="fraction of NaN pixels")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'pixels':>12} {'legacy ms':>10} {'kernel ms':>10} {'speedup':>8} "
+          f"{'legacy MB':>10} {'kernel MB':>10} {'match':>6}")
+    for side in args.sizes:
+        raster = rng.normal(0.45, 0.2, (side, side)).astype(np.float32)
+        raster[rng.random(raster.shape) < args.cloud] = np.nan
+
+        old, old_s, old_peak = measure(legacy_stats, raster, args.repeat)
+        new, new_s, new_peak = measure(ndvi_stats, raster, args.repeat)
+        match = rounded(old) == rounded(new)
+
+        print(f"{side * side:>12,} {old_s * 1000:>10.1f} {new_s * 1000:>10.1f} {old_s / new_s:>7.2f}x "
+              f"{old_peak / 2**20:>10.1f} {new_peak / 2**20:>10.1f} {str(match):>6}")
+        if not match:
+            print(f"  legacy: {rounded(old)}\n  kernel: {rounded(new)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Worker startup benchmark: import time and RSS of app.main, plus time until
+every lazily loaded subsystem (disease model, Sentinel Hub) reports ready.
+
+    python benchmarks/startup_time.py --runs 5
+    python benchmarks/startup_time.py --runs 5 --record benchmarks/startup_history.jsonl
+
+Each run is a fresh interpreter, so imports are cold (apart from the OS
+file cache). --record appends one JSON line per invocation, tagged with the
+current git commit, so the numbers can be tracked over releases.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Runs inside the child interpreter
+CHILD = r"""
+import json, resource, sys, time
+
+def rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+started = time.perf_counter()
+import app.main
+import_s = time.perf_counter() - started
+import_rss = rss_mb()
+
+from app.core.readiness import _resources
+started = time.perf_counter()
+failed = []
+for name, resource_ in _resources.items():
+    try:
+        resource_.get()
+    except Exception:
+        failed.append(name)
+ready_s = time.perf_counter() - started
+
+print(json.dumps({
+    "import_s": import_s,
+    "import_rss_mb": import_rss,
+    "ready_s": ready_s,
+    "ready_rss_mb": rss_mb(),
+    "failed": failed,
+}))
+"""
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--record", help="append results as a JSON line to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ, WARM_UP_ON_STARTUP="false")
+    runs = []
+    for i in range(args.runs):
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env,
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            sys.exit(f"run {i + 1} failed:\n{result.stderr}")
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    summary = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+    }
+    for key in ("import_s", "import_rss_mb", "ready_s", "ready_rss_mb"):
+        values = [r[key] for r in runs]
+        summary[key] = round(statistics.median(values), 3)
+        print(f"{key:>14}: median={statistics.median(values):8.3f}  min={min(values):8.3f}  max={max(values):8.3f}")
+
+    failed = sorted({name for r in runs for name in r["failed"]})
+    if failed:
+        summary["failed"] = failed
+        print(f"Subsystems that failed to load: {', '.join(failed)}")
+
+    if args.record:
+        with open(args.record, "a") as f:
+            f.write(json.dumps(summary) + "\n")
+        print(f"Recorded to {args.record}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Backfill the NDVI observation store so /ndvi/history only has to fetch new dates.
+
+    python scripts/backfill_ndvi.py --days 365
+    python scripts/backfill_ndvi.py --days 730 --workers 8 --field-id 3 --field-id 7
+
+Each field needs one multi-temporal Sentinel Hub request per missing date
+range, so re-running only fetches what was added since the last run.
+Requests still go through the service's concurrency cap and rate limiter.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.core.init_db import init_db  # noqa: E402
+from app.services.NDVI_service import NDVIService  # noqa: E402
+from app.services.NDVI_store import backfill_all  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="how far back to fill")
+    parser.add_argument("--workers", type=int, default=4, help="fields synced in parallel")
+    parser.add_argument("--field-id", type=int, action="append", dest="field_ids",
+                        help="only these fields (repeatable)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()  # make sure the observation tables exist
+
+    started = time.perf_counter()
+    summary = backfill_all(SessionLocal, NDVIService(), args.days, args.workers, args.field_ids)
+    print(f"Synced {summary['fields']} fields with {summary['requests']} Sentinel Hub requests "
+          f"in {time.perf_counter() - started:.1f}s")
+    if summary["failed"]:
+        print(f"Failed fields: {', '.join(str(f) for f in sorted(summary['failed']))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
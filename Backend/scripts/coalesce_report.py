@@ -0,0 +1,86 @@
+"""
+Upstream Sentinel Hub requests for a set of fields, one request per field
+vs. nearby fields coalesced into shared fetches. Planning only, no requests
+are sent.
+
+    python scripts/coalesce_report.py --all
+    python scripts/coalesce_report.py --user-id 3
+    python scripts/coalesce_report.py --field-id 1 --field-id 2 --field-id 5
+    python scripts/coalesce_report.py --region 74.2 32.1 74.4 32.3 --max-gap-m 500
+
+--region takes west south east north and selects fields through the
+spatial index. Gap and raster size limits default to the app settings.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sentinelhub import BBox, CRS  # noqa: E402  # type: ignore
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import SessionLocal  # noqa: E402
+from app.models import db_model  # noqa: E402
+from app.services.fields_service import fields_intersecting  # noqa: E402
+from app.services.NDVI_coalesce import plan_field_groups, requests_without_coalescing  # noqa: E402
+from app.services.NDVI_geometry import output_dimensions  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--all", action="store_true", help="every field in the database")
+    selection.add_argument("--user-id", type=int, help="all fields of one user")
+    selection.add_argument("--field-id", type=int, action="append", dest="field_ids", help="repeatable")
+    selection.add_argument("--region", type=float, nargs=4, metavar=("WEST", "SOUTH", "EAST", "NORTH"))
+    parser.add_argument("--max-gap-m", type=float, default=settings.ndvi_coalesce_max_gap_m)
+    parser.add_argument("--max-px", type=int, default=settings.ndvi_coalesce_max_px)
+    parser.add_argument("--groups", action="store_true", help="list every group")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.region:
+            fields = fields_intersecting(db, *args.region)
+        else:
+            query = db.query(db_model.Field)
+            if args.user_id is not None:
+                query = query.filter(db_model.Field.user_id == args.user_id)
+            elif args.field_ids:
+                query = query.filter(db_model.Field.id.in_(args.field_ids))
+            fields = query.all()
+    finally:
+        db.close()
+
+    if not fields:
+        sys.exit("No fields selected")
+
+    resolution = settings.ndvi_resolution_m
+    before = requests_without_coalescing(fields, resolution, settings.ndvi_tile_size_px, settings.ndvi_max_pixels)
+    groups = plan_field_groups(fields, args.max_gap_m, args.max_px, resolution)
+
+    def pixels(bounds) -> int:
+        (width, height), _ = output_dimensions(BBox(list(bounds), crs=CRS.WGS84), resolution)
+        return width * height
+
+    pixels_before = sum(pixels([f.west, f.south, f.east, f.north]) for f in fields)
+    pixels_after = sum(pixels(group["bbox"]) for group in groups)
+
+    print(f"fields:               {len(fields)}")
+    print(f"requests per field:   {before}")
+    print(f"requests coalesced:   {len(groups)}  ({before / len(groups):.1f}x fewer)")
+    print(f"pixels per field:     {pixels_before:,}")
+    print(f"pixels coalesced:     {pixels_after:,}  (covering rasters include gaps between fields)")
+    shared = [g for g in groups if len(g["field_ids"]) > 1]
+    print(f"shared groups:        {len(shared)}, largest has {max(len(g['field_ids']) for g in groups)} fields")
+
+    if args.groups:
+        for group in sorted(groups, key=lambda g: -len(g["field_ids"])):
+            west, south, east, north = group["bbox"]
+            print(f"  [{west:.5f}, {south:.5f}, {east:.5f}, {north:.5f}] "
+                  f"{pixels(group['bbox']):>9,} px  fields {group['field_ids']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Convert the Keras disease model to TFLite for the lightweight inference backend.
+
+    python scripts/convert_disease_model.py models/disease.keras models/disease.tflite
+    python scripts/convert_disease_model.py models/disease.keras models/disease_int8.tflite \
+        --quantize int8 --calibration-dir samples/leaves
+
+--quantize:
+  none     float32 weights and activations
+  dynamic  int8 weights, float activations (no calibration data needed)
+  int8     full integer quantization, calibrated on --calibration-dir images
+           (input/output stay float32, so the API code doesn't change)
+
+Point DISEASE_TFLITE_MODEL_PATH at the output and set DISEASE_BACKEND=tflite
+(or auto). Check accuracy with benchmarks/disease_backends.py before switching.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.disease_preprocessing import preprocess_image  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def list_images(folder: str) -> list:
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def load_preprocessed(path: str) -> np.ndarray:
+    with open(path, "rb") as f:
+        return preprocess_image(f.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("keras_model")
+    parser.add_argument("output")
+    parser.add_argument("--quantize", choices=["none", "dynamic", "int8"], default="none")
+    parser.add_argument("--calibration-dir", help="sample leaf images for int8 calibration")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    args = parser.parse_args()
+
+    import tensorflow as tf  # type: ignore
+
+    model = tf.keras.models.load_model(args.keras_model)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if args.quantize in ("dynamic", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if args.quantize == "int8":
+        if not args.calibration_dir:
+            parser.error("--quantize int8 needs --calibration-dir")
+        paths = list_images(args.calibration_dir)[:args.calibration_samples]
+        if not paths:
+            parser.error(f"no images found in {args.calibration_dir}")
+
+        def representative_dataset():
+            for path in paths:
+                yield [load_preprocessed(path)[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    tflite_model = converter.convert()
+    with open(args.output, "wb") as f:
+        f.write(tflite_model)
+
+    size_mb = len(tflite_model) / (1024 * 1024)
+    print(f"Wrote {args.output} ({size_mb:.1f} MB, quantize={args.quantize})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import time
+
+from app.services.NDVI_geotiff import GeoTIFFExportCache
+
+
+def counting_writer(writes: list):
+    def write(path: str):
+        writes.append(path)
+        with open(path, "wb") as f:
+            f.write(b"cog")
+    return write
+
+
+def test_final_export_is_written_once(tmp_path):
+    cache, writes = GeoTIFFExportCache(str(tmp_path), max_bytes=1 << 20), []
+    first = cache.get_or_write("key", counting_writer(writes))
+    assert cache.get_or_write("key", counting_writer(writes)) == first
+    assert len(writes) == 1
+
+
+def test_export_with_ttl_is_rebuilt_after_expiry(tmp_path):
+    cache, writes = GeoTIFFExportCache(str(tmp_path), max_bytes=1 << 20), []
+    cache.get_or_write("key", counting_writer(writes), ttl_s=0.05)
+    assert cache.get("key", ttl_s=0.05) is not None
+    cache.get_or_write("key", counting_writer(writes), ttl_s=0.05)
+    assert len(writes) == 1
+
+    time.sleep(0.06)
+    assert cache.get("key", ttl_s=0.05) is None
+    cache.get_or_write("key", counting_writer(writes), ttl_s=0.05)
+    assert len(writes) == 2
+
+
+def test_export_with_ttl_from_before_a_restart_is_rebuilt(tmp_path):
+    GeoTIFFExportCache(str(tmp_path), max_bytes=1 << 20).get_or_write("key", counting_writer([]), ttl_s=60)
+    restarted = GeoTIFFExportCache(str(tmp_path), max_bytes=1 << 20)
+    assert restarted.get("key", ttl_s=60) is None
+    assert restarted.get("key") is not None
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.services.NDVI_stats import ACCUMULATOR_BINS, NDVIStatsAccumulator, ndvi_stats
+
+BIN_WIDTH = 2.0 / ACCUMULATOR_BINS
+
+
+def random_ndvi(rng: np.random.Generator, size: int, cloud_fraction: float = 0.2) -> np.ndarray:
+    values = rng.uniform(-1.0, 1.0, size).astype(np.float32)
+    values[rng.random(size) < cloud_fraction] = np.nan
+    return values
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 10, 11, 1000, 1001, 50000])
+def test_accumulator_median_matches_numpy(size):
+    rng = np.random.default_rng(size)
+    values = random_ndvi(rng, size, cloud_fraction=0.0)
+    median = NDVIStatsAccumulator().add(values).median()
+    assert median == pytest.approx(float(np.median(values)), abs=BIN_WIDTH)
+
+
+def test_accumulator_median_of_two_values():
+    values = np.array([0.1456, 1.0], dtype=np.float32)
+    assert NDVIStatsAccumulator().add(values).median() == pytest.approx(0.5728, abs=BIN_WIDTH)
+
+
+def test_merged_tiles_match_whole_raster():
+    rng = np.random.default_rng(0)
+    raster = random_ndvi(rng, 40000).reshape(200, 200)
+
+    merged = NDVIStatsAccumulator()
+    for tile in np.array_split(raster, 7, axis=0):
+        merged.merge(NDVIStatsAccumulator().add(tile))
+    result = merged.result()
+    expected = ndvi_stats(raster)
+
+    assert result["valid_pixels"] == expected["valid_pixels"]
+    assert result["health_distribution"] == expected["health_distribution"]
+    assert result["mean"] == pytest.approx(expected["mean"])
+    assert result["min"] == expected["min"]
+    assert result["max"] == expected["max"]
+    assert result["median"] == pytest.approx(float(np.nanmedian(raster)), abs=BIN_WIDTH)
+
+
+def test_ndvi_stats_matches_numpy():
+    rng = np.random.default_rng(1)
+    raster = random_ndvi(rng, 12345)
+    stats = ndvi_stats(raster, chunk_size=1000)
+    assert stats["valid_pixels"] == np.count_nonzero(~np.isnan(raster))
+    assert stats["median"] == float(np.nanmedian(raster))
+    assert stats["mean"] == pytest.approx(float(np.nanmean(raster)), rel=1e-6)
+
+
+def test_empty_input():
+    assert NDVIStatsAccumulator().add(np.full(10, np.nan)).result()["median"] is None
+    assert ndvi_stats(np.full(10, np.nan))["median"] is None